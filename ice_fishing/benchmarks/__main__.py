@@ -0,0 +1,47 @@
+"""
+Benchmarks of the ice fishing model
+
+    python -m ice_fishing.benchmarks run --preset quick --output baseline.json
+    python -m ice_fishing.benchmarks run --preset quick --output current.json
+    python -m ice_fishing.benchmarks compare baseline.json current.json --threshold 0.2
+
+compare exits with status 1 if a benchmark became slower than the threshold.
+"""
+import argparse
+import sys
+
+from .cases import PRESETS
+from .runner import run_benchmarks, save_results, load_results, compare
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ice_fishing.benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and save the results")
+    run_parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    run_parser.add_argument("--filter", default="*", help="glob pattern of the benchmark names, e.g. 'micro/*'")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--output", required=True, help="JSON file of the results")
+
+    compare_parser = commands.add_parser("compare", help="flag the benchmarks that became slower")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown, 0.2 for 20 %%")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        save_results(run_benchmarks(args.preset, args.filter, args.repeat, verbose=True), args.output)
+        return 0
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    regressions = compare(baseline, current, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms ({change:+.0%})")
+    if not regressions:
+        print(f"No regressions above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
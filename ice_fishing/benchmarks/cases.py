@@ -0,0 +1,110 @@
+import numpy as np
+from mesa.visualization.ModularVisualization import ModularServer
+
+from ice_fishing.ice_fishing_m1 import server
+from ice_fishing.ice_fishing_m1.belief import Belief
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.resource import ResourceDynamics
+from ice_fishing.ice_fishing_m1.utils.cache import cached_resource_map
+from ice_fishing.ice_fishing_m1.utils.utils import CatchHistory, catch_rate, draw_circe_around_point, \
+    sample_resource_map
+
+AGENT_MODELS = ("random", "imitator", "greedy_bayesian")
+
+# sizes of the scaling curves of each preset
+PRESETS = {
+    "quick": {
+        "grid_sizes": (30, 100),
+        "agent_counts": (5, 50),
+        "n_steps": 20,
+        "server_grid_sizes": (30,),
+    },
+    "full": {
+        "grid_sizes": (30, 100, 200, 500),
+        "agent_counts": (5, 50, 200, 1000),
+        "n_steps": 100,
+        "server_grid_sizes": (30, 100),
+    },
+}
+
+
+def _draw_circle():
+    array = np.zeros((100, 100))
+    return lambda: draw_circe_around_point(array, 50, 50, radius=3)
+
+
+def _update_belief():
+    belief = Belief(100, 100)
+    belief.update_prior_belief()
+    locs = ((10, 10), (40, 60), (50, 50), (70, 20), (90, 90))
+    rates = (0.1, 0.5, 0.2, 0.0, 0.8)
+    return lambda: belief.update_belief(locs, locs, rates)
+
+
+def _sample_resource_map():
+    return lambda: sample_resource_map(100, 100, n_samples=100_000)
+
+
+def _cached_resource_map():
+    # the map is built once, the model gets a copy of it
+    cached_resource_map(100, 100, n_samples=100_000)
+    return lambda: cached_resource_map(100, 100, n_samples=100_000)
+
+
+def _catch_rate(history):
+    rng = np.random.default_rng(0)
+    for caught in rng.integers(0, 2, 200):
+        history.append(int(caught))
+    return lambda: catch_rate(history)
+
+
+def _run_model(n_steps: int, **kwargs):
+    def run():
+        model = IceFishingModel(seed=0, **kwargs)
+        model.run_model(n_steps)
+    return run
+
+
+def _resource_dynamics(size: int):
+    resource_map = IceFishingModel(width=size, height=size, seed=0).resource_map
+    capacity = resource_map.copy()
+    dynamics = ResourceDynamics(growth_rate=0.05, diffusion=0.05, drift=(0.02, 0.0))
+    rng = np.random.default_rng(0)
+    return lambda: dynamics.step(resource_map, capacity, rng)
+
+
+def _server_setup(**kwargs):
+    # the server with the raster elements of the visualisation and its first frame
+    def setup():
+        modular_server = ModularServer(IceFishingModel, server.plots, "Ice Fishing",
+                                       {**server.model_params, "seed": 0, **kwargs})
+        modular_server.render_model()
+    return setup
+
+
+def benchmark_cases(preset: str = "quick") -> dict:
+    """
+    Benchmarks of a preset, by name. Each case is a function that prepares the benchmark and returns the function to
+    be timed.
+    """
+    sizes = PRESETS[preset]
+    cases = {
+        "micro/draw_circe_around_point": _draw_circle,
+        "micro/belief_update_belief": _update_belief,
+        "micro/sample_resource_map": _sample_resource_map,
+        "micro/cached_resource_map": _cached_resource_map,
+        "micro/catch_rate_history": lambda: _catch_rate(CatchHistory()),
+        "micro/catch_rate_list": lambda: _catch_rate([]),
+    }
+    for agent_model in AGENT_MODELS:
+        for size in sizes["grid_sizes"]:
+            cases[f"grid/{agent_model}/{size}"] = lambda a=agent_model, s=size: _run_model(
+                sizes["n_steps"], width=s, height=s, agent_model=a)
+        for n_agents in sizes["agent_counts"]:
+            cases[f"agents/{agent_model}/{n_agents}"] = lambda a=agent_model, n=n_agents: _run_model(
+                sizes["n_steps"], width=100, height=100, n_agents=n, agent_model=a)
+    for size in sizes["grid_sizes"]:
+        cases[f"resource_dynamics/{size}"] = lambda s=size: _resource_dynamics(s)
+    for size in sizes["server_grid_sizes"]:
+        cases[f"server_setup/{size}"] = lambda s=size: _server_setup(width=s, height=s)
+    return cases
@@ -0,0 +1,91 @@
+import fnmatch
+import json
+import platform
+import time
+
+import numpy as np
+
+from ice_fishing.ice_fishing_m1.utils.cache import code_version
+from .cases import benchmark_cases
+
+
+def time_case(prepare, repeat: int = 5, min_time: float = 0.05) -> list[float]:
+    """
+    Seconds per call of a benchmark, one value per repetition. Fast functions are called several times per repetition.
+
+    :param prepare: function returning the function to be timed
+    :param min_time: minimal duration of a repetition in seconds
+    """
+    func = prepare()
+    # warm up, e.g. the caches of the resource maps
+    func()
+
+    # calibrate the number of calls per repetition
+    n_calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        n_calls *= 10 if elapsed < min_time / 10 else 2
+
+    times = [elapsed / n_calls]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            func()
+        times.append((time.perf_counter() - start) / n_calls)
+    return times
+
+
+def run_benchmarks(preset: str = "quick", pattern: str = "*", repeat: int = 5, verbose: bool = False) -> dict:
+    """
+    Run the benchmarks of a preset whose names match the pattern
+
+    :return: JSON-ready results with the median, minimum and all times of each benchmark in seconds
+    """
+    results = {}
+    for name, prepare in benchmark_cases(preset).items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        times = time_case(prepare, repeat=repeat)
+        results[name] = {"median": float(np.median(times)), "min": float(np.min(times)), "times": times}
+        if verbose:
+            print(f"{name:45s} {results[name]['median'] * 1e3:12.3f} ms")
+    return {
+        "preset": preset,
+        "code_version": code_version(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def save_results(results: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=1)
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list[tuple[str, float, float, float]]:
+    """
+    Benchmarks that are slower than the baseline by more than the threshold, e.g. 0.2 for 20 %
+
+    :return: list of (name, baseline median, current median, relative change)
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median"]
+        change = result["median"] / before - 1
+        if change > threshold:
+            regressions.append((name, before, result["median"], change))
+    return regressions
@@ -0,0 +1,74 @@
+/* RasterModule.js
+ Draws a heatmap of a model array. The server sends quantised frames, either as a key frame
+ or as the changed cells since the previous frame, see raster.py.
+*/
+const RasterModule = function (canvas_width, canvas_height, palette_b64) {
+  const decode = (b64) => Uint8Array.from(atob(b64), (c) => c.charCodeAt(0));
+  const palette = decode(palette_b64);
+
+  const canvas = document.createElement("canvas");
+  Object.assign(canvas, { width: canvas_width, height: canvas_height });
+  canvas.style.border = "1px dotted";
+  document.getElementById("elements").appendChild(canvas);
+  const context = canvas.getContext("2d");
+
+  // the frame is drawn at its own resolution and scaled to the canvas
+  const raster = document.createElement("canvas");
+  const rasterContext = raster.getContext("2d");
+  let frame = null;
+  let width = 0;
+  let height = 0;
+
+  const draw = function (markers) {
+    const image = rasterContext.createImageData(width, height);
+    for (let x = 0; x < width; x++) {
+      for (let y = 0; y < height; y++) {
+        // the frame is in (width, height) order, y = 0 is drawn at the bottom
+        const color = 3 * frame[x * height + y];
+        const pixel = 4 * ((height - 1 - y) * width + x);
+        image.data[pixel] = palette[color];
+        image.data[pixel + 1] = palette[color + 1];
+        image.data[pixel + 2] = palette[color + 2];
+        image.data[pixel + 3] = 255;
+      }
+    }
+    rasterContext.putImageData(image, 0, 0);
+    context.imageSmoothingEnabled = false;
+    context.drawImage(raster, 0, 0, canvas_width, canvas_height);
+
+    const cellWidth = canvas_width / width;
+    const cellHeight = canvas_height / height;
+    (markers || []).forEach(([x, y, color]) => {
+      context.beginPath();
+      context.arc((x + 0.5) * cellWidth, (height - y - 0.5) * cellHeight,
+        Math.max(2, 0.4 * Math.min(cellWidth, cellHeight)), 0, 2 * Math.PI);
+      context.fillStyle = color;
+      context.fill();
+    });
+  };
+
+  this.render = function (data) {
+    if (data.type === "key") {
+      width = data.width;
+      height = data.height;
+      raster.width = width;
+      raster.height = height;
+      frame = decode(data.values);
+    } else {
+      if (frame === null) {
+        return;
+      }
+      const indices = new Uint32Array(decode(data.indices).buffer);
+      const values = decode(data.values);
+      for (let i = 0; i < indices.length; i++) {
+        frame[indices[i]] = values[i];
+      }
+    }
+    draw(data.markers);
+  };
+
+  this.reset = function () {
+    frame = null;
+    context.clearRect(0, 0, canvas_width, canvas_height);
+  };
+};
@@ -0,0 +1,63 @@
+/* SimulationControl.js
+ Controls of the decoupled server, see decoupled_server.py. The model runs on the server, which pushes frames at a
+ capped rate. The client only plays, pauses and fast-forwards the model instead of requesting every step.
+*/
+const SimulationControl = function () {
+  controller.start = function () {
+    this.running = true;
+    startModelButton.firstElementChild.innerText = "Stop";
+    send({ type: "play" });
+  };
+
+  controller.stop = function () {
+    this.running = false;
+    startModelButton.firstElementChild.innerText = "Start";
+    send({ type: "pause" });
+  };
+
+  // the frames are pushed by the server, they do not trigger the next step
+  controller.render = function (data) {
+    vizElements.forEach((element, index) => element.render(data[index]));
+  };
+
+  controller.updateFPS = function (val) {
+    this.fps = Number(val);
+    send({ type: "fps", fps: this.fps });
+  };
+
+  const control = document.createElement("div");
+  control.innerHTML = `
+    <label class="badge bg-primary" for="fast-forward-steps" style="margin-right: 15px">Fast-forward</label>
+    <input id="fast-forward-steps" type="number" min="1" value="500" style="width: 100px"/>
+    <button id="fast-forward" class="btn btn-sm btn-secondary">steps</button>
+  `;
+  document.getElementById("elements-topbar").appendChild(control);
+  const steps = document.getElementById("fast-forward-steps");
+  document.getElementById("fast-forward").onclick = () => {
+    send({ type: "fast_forward", steps: Number(steps.value) });
+  };
+
+  // a failed simulation ends with the error
+  const error = document.createElement("span");
+  error.className = "text-danger";
+  error.style.marginLeft = "15px";
+  control.appendChild(error);
+  const onmessage = ws.onmessage;
+  ws.onmessage = function (message) {
+    const msg = JSON.parse(message.data);
+    if (msg.type === "end" && msg.error) {
+      error.innerText = msg.error;
+    }
+    onmessage(message);
+  };
+
+  // the step of the model, the client does not count the steps
+  this.render = function (step) {
+    controller.tick = step;
+    stepDisplay.innerText = step;
+  };
+
+  this.reset = function () {
+    error.innerText = "";
+  };
+};
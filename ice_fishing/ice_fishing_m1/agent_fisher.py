@@ -4,42 +4,35 @@ import mesa
 import numpy as np
 import scipy
 
-from .belief import Belief
-from .utils.utils import catch_rate
+from .utils.utils import CatchHistory, catch_rate
 
 
 class BaseIceFisher(mesa.Agent):
+    # whether the agent reads its belief to choose actions
+    uses_belief = False
+
     def __init__(self,
                  unique_id: int,
                  model: mesa.Model,
                  state: Literal["moving", "fishing", "initial"] = "initial",
                  max_fishing_time: int = 10):
         super().__init__(unique_id, model)
-        self.belief = Belief(model.grid.width, model.grid.height)
+        self.belief = None
+        if self.uses_belief or model.record_beliefs:
+            self.belief = model.new_belief()
+            self.belief.update_prior_belief()
         self.state = state
         self.fishing_time = 0
         self.max_fishing_time = max_fishing_time
         self.total_catch = 0
-        self.last_catches = []
+        self.last_catches = CatchHistory(window_size=50)
         self.destination = None
 
-        self.belief.update_prior_belief()
-
     def move(self, destination: tuple[int, int]):
         """
         Move agent one cell closer to the destination
         """
-        x, y = self.pos
-        dx, dy = destination
-        if x < dx:
-            x += 1
-        elif x > dx:
-            x -= 1
-        if y < dy:
-            y += 1
-        elif y > dy:
-            y -= 1
-        self.model.grid.move_agent(self, (x, y))
+        self.model.grid.move_agent(self, self.model.kernels.step_towards(self.pos, destination))
 
     def fish(self):
         """
@@ -48,19 +41,58 @@ class BaseIceFisher(mesa.Agent):
         # first time no fishing, only drilling
         if self.fishing_time > 0:
             n_fish = self.model.resource_map[self.pos]
-            p_catch = min(n_fish / self.model.fish_catch_threshold, 0.8)
-            if np.random.rand() < p_catch:
+            if self.model.kernels.catch_trial(n_fish, self.model.rng.random(), self.model.fish_catch_threshold):
                 # fish is caught successfully
                 self.total_catch += 1
                 self.last_catches.append(1)
-                # depletion of the resource
-                self.model.resource_map[self.pos] -= 1
+                self.model.record_catch(self)
             else:
                 self.last_catches.append(0)
+            self.model.fishing_index.update_catches(self)
 
         # increase fishing time
         self.fishing_time += 1
 
+    def plan_fishing_bout(self, n_fish: int) -> np.ndarray:
+        """
+        Draw the outcomes of all fishing trials of the current bout at once, they are performed by advance
+
+        :param n_fish: number of fish in the cell available to the agent
+        """
+        self._planned_catches = self.model.kernels.draw_catches(n_fish, self.max_fishing_time - 1,
+                                                                self.model.fish_catch_threshold, self.model.rng)
+        return self._planned_catches
+
+    def action_duration(self) -> int:
+        """
+        Number of steps until the next decision, for an action selected in the current step
+        """
+        if self.state == "moving":
+            return max(max(abs(d - p) for d, p in zip(self.destination, self.pos)), 1)
+        return self.max_fishing_time
+
+    def advance(self, n_done: int, n_steps: int):
+        """
+        Perform the steps n_done, ..., n_steps - 1 of the current action at once, as the event scheduler does
+        """
+        if self.state == "moving":
+            n = n_steps - n_done
+            # every step moves one cell along each axis until the destination is reached
+            pos = tuple(p + int(np.sign(d - p)) * min(n, abs(d - p)) for d, p in zip(self.destination, self.pos))
+            if pos != self.pos:
+                self.model.grid.move_agent(self, pos)
+        elif self.state == "fishing":
+            # the first step is only drilling
+            outcomes = self._planned_catches[max(n_done - 1, 0):max(n_steps - 1, 0)]
+            if len(outcomes) > 0:
+                self.last_catches.extend(outcomes)
+                n_caught = int(outcomes.sum())
+                if n_caught > 0:
+                    self.total_catch += n_caught
+                    self.model.record_catch(self, n_caught)
+                self.model.fishing_index.update_catches(self)
+            self.fishing_time = n_steps
+
     def _check_fishing_done(self) -> bool:
         """
         Check if fishing is done
@@ -96,7 +128,7 @@ class BaseIceFisher(mesa.Agent):
 
     def _clean_up_previous_state(self):
         # reset catch history
-        self.last_catches = []
+        self.last_catches.clear()
         self.fishing_time = 0
 
     def get_far_destination(self, radius=5) -> tuple[int, int]:
@@ -123,6 +155,7 @@ class BaseIceFisher(mesa.Agent):
         if not self._check_current_action_done():
             return
 
+        previous_state = self.state
         if self.state == "initial":
             self.state = "moving"
             self.destination = self.get_far_destination()
@@ -130,12 +163,14 @@ class BaseIceFisher(mesa.Agent):
             self.state = "fishing"
         elif self.state == "fishing":
             rate = catch_rate(self.last_catches, window_size=50)
-            self.update_belief()
+            if self.belief is not None:
+                self.update_belief()
             self.choose_action(rate)
         else:
             raise ValueError("Unknown state")
 
         self._clean_up_previous_state()
+        self.model.fisher_action_selected(self, previous_state)
 
     def step(self):
         # select the next action if the current is done
@@ -150,17 +185,17 @@ class BaseIceFisher(mesa.Agent):
             raise ValueError("Unknown state")
 
     def update_belief(self):
-        # get close neighbors
-        close_neighbors = self.model.grid.get_neighbors(self.pos, moore=True, include_center=True, radius=10)
-        close_fishing_neighbors = [n for n in close_neighbors if isinstance(n, BaseIceFisher) and n.state == "fishing"]
-        locs = tuple([n.pos for n in close_fishing_neighbors] + [self.pos])
-        rates = tuple([catch_rate(n.last_catches) for n in close_fishing_neighbors] + [catch_rate(self.last_catches)])
+        # get close fishing neighbors, including the agent itself
+        index = self.model.fishing_index
+        close_fishing_neighbors = index.within(self.pos, radius=10)
+        self.model.materialise_fishing(close_fishing_neighbors)
+        locs = tuple([index.position(n) for n in close_fishing_neighbors] + [self.pos])
+        rates = tuple([index.catch_rates[n] for n in close_fishing_neighbors] + [catch_rate(self.last_catches)])
 
-        all_neighbors = self.model.grid.get_neighbors(self.pos, moore=True, include_center=False,
-                                                      radius=self.model.grid.width)
-        all_fishing_neighbors = [n for n in all_neighbors if isinstance(n, BaseIceFisher) and n.state == "fishing"]
-        all_locs = tuple([n.pos for n in all_fishing_neighbors])
-        self.belief.update_belief(all_locs, locs, rates)
+        # shared social information of all fishing agents except the ones in the current cell
+        self.belief.use_social_field(self.model.social_field, exclude=self.pos)
+        self.belief.update_catch_likelihood(locs, rates)
+        self.belief.apply_likelihoods()
 
 
 class ImitatorIceFisher(BaseIceFisher):
@@ -169,35 +204,26 @@ class ImitatorIceFisher(BaseIceFisher):
         super().__init__(*args, **kwargs)
 
     def get_far_destination(self, radius=5) -> tuple[int, int]:
-        # select random destination
-        neighbors = self.model.grid.get_neighbors(self.pos, moore=True, include_center=False, radius=radius)
-
-        # select agents with non-zero catch history
-        neighbors_with_catches = [n for n in neighbors if hasattr(n, "last_catches") and sum(n.last_catches) > 0]
+        # the cell of the fishing agent with the most catches in its bout, excluding the current cell
+        self.model.materialise_window(self.pos, radius)
+        best = self.model.fishing_index.best_within(self.pos, radius=radius, include_center=False)
 
         # return random destination if no neighbors with non-zero catch history
-        if len(neighbors_with_catches) == 0:
+        if best is None:
             neighbors = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False, radius=radius)
             return self.model.random.choice(neighbors)
-
-        # select the most successful agent
-        neighbors_with_catches = sorted(neighbors_with_catches, key=lambda x: sum(x.last_catches), reverse=True)
-
-        # return the position of the most successful agent
-        return neighbors_with_catches[0].pos
+        return best
 
 
 class GreedyBayesFisher(BaseIceFisher):
+    uses_belief = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
     def choose_action(self, rate: float = 0, temperature: float = 0.8):
-        # select the most promising cell
-        belief = self.belief.belief.copy()
-
-        # randomly select in case of multiple maxima
-        x, y = np.unravel_index(np.argmax(np.random.random(belief.shape) * (belief == belief.max())),
-                                self.belief.belief.shape)
+        # select the most promising cell, randomly in case of multiple maxima
+        x, y = self.belief.greedy_cell(self.model.rng)
 
         # with the small probability select random cell
         if self.model.random.random() < 0.05:
@@ -1,45 +1,143 @@
+from collections import Counter
+from functools import partial
+
 import numpy as np
 import scipy
 
 from ice_fishing.ice_fishing_m1.utils.discrete_bayes_filter import normalize
-from ice_fishing.ice_fishing_m1.utils.utils import draw_circe_around_point as circle
+from ice_fishing.ice_fishing_m1.utils.utils import disk_likelihood, greedy_argmax, stamp_disk
+
+# likelihood buffers shared by all beliefs with the same shape and type
+_shared_buffers = {}
+
+
+def _shared_buffer(name: str, shape: tuple[int, int], dtype: np.dtype) -> np.ndarray:
+    key = (name, shape, dtype)
+    if key not in _shared_buffers:
+        _shared_buffers[key] = np.zeros(shape, dtype=dtype)
+    return _shared_buffers[key]
+
+
+def _social_likelihood(other_locs: tuple[tuple[int, int], ...],
+                       radius: int,
+                       weight: float,
+                       out: np.ndarray) -> np.ndarray:
+    # a circle around each other agent
+    return disk_likelihood(other_locs, (weight,) * len(other_locs), radius, out)
+
+
+def _tally_likelihood(tally: Counter, radius: int, weight: float, out: np.ndarray) -> np.ndarray:
+    return _social_likelihood(tuple(tally.elements()), radius, weight, out)
 
 
 class Belief:
-    def __init__(self, width: int, height: int) -> None:
-        self.catch_likelihood = np.zeros((width, height))
-        self.social_likelihood = np.zeros((width, height))
-        self.belief = np.zeros((width, height))
+    def __init__(self,
+                 width: int,
+                 height: int,
+                 dtype: np.dtype = np.float64,
+                 log_domain: bool = False,
+                 shared_buffers: bool = False,
+                 buffer: np.ndarray = None) -> None:
+        """
+        Belief of an agent about the fish locations
+
+        :param width: grid width
+        :param height: grid height
+        :param dtype: floating point type of the arrays, e.g. np.float32 for a compact belief
+        :param log_domain: store the logarithm of the belief, so that the repeated updates do not underflow
+        :param shared_buffers: share the likelihood buffers between all beliefs of the same shape and type, the
+            likelihoods are then recomputed on demand from the last measurements
+        :param buffer: array to store the belief in, e.g. a row of a BeliefBank, its content is kept
+        """
+        self.shape = (width, height)
+        self.dtype = np.dtype(dtype) if buffer is None else buffer.dtype
+        self.log_domain = log_domain
+        self.shared_buffers = shared_buffers
+
+        if shared_buffers:
+            self._catch_buffer = _shared_buffer("catch", self.shape, self.dtype)
+            self._social_buffer = _shared_buffer("social", self.shape, self.dtype)
+        else:
+            self._catch_buffer = np.zeros(self.shape, dtype=self.dtype)
+            self._social_buffer = np.zeros(self.shape, dtype=self.dtype)
+        # functions filling a buffer with the likelihood of the last measurements
+        self._catch_source = None
+        self._social_source = None
+
+        # the belief or its logarithm in the log domain
+        self._belief = np.zeros(self.shape, dtype=self.dtype) if buffer is None else buffer
+
+    @property
+    def belief(self) -> np.ndarray:
+        if self.log_domain:
+            return normalize(np.exp(self._belief))
+        return self._belief
+
+    @belief.setter
+    def belief(self, value: np.ndarray) -> None:
+        self._belief[...] = np.log(value) if self.log_domain else value
+
+    @property
+    def log_belief(self) -> np.ndarray:
+        """
+        Logarithm of the belief up to an additive constant
+        """
+        return self._belief if self.log_domain else np.log(self._belief)
+
+    def _likelihood(self, buffer: np.ndarray, source) -> np.ndarray:
+        if not self.shared_buffers:
+            return buffer
+        # the shared buffer may hold the likelihood of another agent
+        out = np.zeros(self.shape, dtype=self.dtype)
+        return source(out) if source is not None else out
+
+    @property
+    def catch_likelihood(self) -> np.ndarray:
+        return self._likelihood(self._catch_buffer, self._catch_source)
+
+    @property
+    def social_likelihood(self) -> np.ndarray:
+        return self._likelihood(self._social_buffer, self._social_source)
 
     def update_prior_belief(self,
                             locs: tuple[tuple[int, int], ...] = None,
                             radius: int = 3) -> None:
-        self.belief = np.zeros_like(self.belief) + 1e-5  # add a small number to avoid 0 probability
+        prior = np.full(self.shape, 1e-5, dtype=self.dtype)  # add a small number to avoid 0 probability
 
         if locs is not None:
             for x, y in locs:
                 # make a circle around prior center location
-                self.belief += circle(np.zeros_like(self.belief), x, y, radius)
-        self.belief = normalize(self.belief)
+                stamp_disk(prior, x, y, radius)
+        self.belief = normalize(prior)
 
     def update_social_likelihood(self,
                                  other_locs: tuple[tuple[int, int], ...],
                                  radius: int = 5,
                                  weight: float = 0.1) -> None:
-        # add a small number to avoid 0 probability
-        self.social_likelihood = np.zeros_like(self.social_likelihood) + 1e-5
-        for x, y in other_locs:
-            # make a circle around the other agent
-            self.social_likelihood += circle(np.zeros_like(self.social_likelihood), x, y, radius) * weight
+        self._social_source = partial(_social_likelihood, other_locs, radius, weight)
+        self._social_source(self._social_buffer)
+
+    def use_social_field(self, social_field, exclude: tuple[int, int] = None) -> None:
+        """
+        Take the social likelihood from the social field shared by all agents
+
+        :param social_field: SocialField of the model
+        :param exclude: cell whose fishing agents are not taken into account
+        """
+        if self.shared_buffers:
+            # the likelihood is recomputed on demand from the occupied cells as they are now, not from the changing
+            # shared field, the locations are only expanded then
+            tally = social_field.tally.copy()
+            tally.pop(exclude, None)
+            self._social_source = partial(_tally_likelihood, tally, social_field.radius, social_field.weight)
+        social_field.likelihood(exclude, out=self._social_buffer)
 
     def update_catch_likelihood(self,
                                 loc: tuple[tuple[int, int], ...],
                                 catch_rates: tuple[float, ...],
                                 radius: int = 3) -> None:
-        self.catch_likelihood = np.zeros_like(self.catch_likelihood) + 1e-5  # add a small number to avoid 0 probability
-
-        for (x, y), catch_rate in zip(loc, catch_rates):
-            self.catch_likelihood += circle(np.zeros_like(self.catch_likelihood), x, y, radius=radius) * catch_rate
+        self._catch_source = partial(disk_likelihood, loc, catch_rates, radius)
+        self._catch_source(self._catch_buffer)
 
     def update_belief(self,
                       measures_social_loc: tuple[tuple[int, int], ...],
@@ -47,4 +145,25 @@ class Belief:
                       measures_catch_value: tuple[float, ...]) -> None:
         self.update_social_likelihood(measures_social_loc)
         self.update_catch_likelihood(measures_catch_loc, measures_catch_value)
-        self.belief = normalize(self.belief * self.social_likelihood * self.catch_likelihood)
+        self.apply_likelihoods()
+
+    def apply_likelihoods(self) -> None:
+        """
+        Combine the current belief with the social and catch likelihoods
+        """
+        if self.log_domain:
+            self._belief += np.log(self._social_buffer)
+            self._belief += np.log(self._catch_buffer)
+            # keep the maximum at 0 instead of normalizing
+            self._belief -= self._belief.max()
+        else:
+            self._belief *= self._social_buffer
+            self._belief *= self._catch_buffer
+            self._belief /= self._belief.sum()
+
+    def greedy_cell(self, rng=np.random) -> tuple[int, int]:
+        """
+        The most promising cell, ties are broken randomly
+        """
+        x, y = greedy_argmax(self._belief[None], rng)[0]
+        return int(x), int(y)
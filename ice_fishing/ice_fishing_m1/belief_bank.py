@@ -0,0 +1,81 @@
+import numpy as np
+
+from .belief import Belief
+from .utils.utils import greedy_argmax
+
+
+class BeliefBank:
+    def __init__(self,
+                 n_agents: int,
+                 width: int,
+                 height: int,
+                 dtype: np.dtype = np.float64,
+                 log_domain: bool = False,
+                 shared_buffers: bool = False) -> None:
+        """
+        Beliefs of all agents stored in one (n_agents, width, height) array
+
+        :param n_agents: number of beliefs in the bank
+        :param width: grid width
+        :param height: grid height
+        :param dtype: floating point type of the beliefs
+        :param log_domain: store the logarithm of the beliefs
+        :param shared_buffers: share the likelihood buffers between the per agent beliefs
+        """
+        self.shape = (width, height)
+        self.log_domain = log_domain
+        self.shared_buffers = shared_buffers
+        self.beliefs = np.zeros((n_agents, width, height), dtype=dtype)
+        self.n_beliefs = 0
+
+    def belief(self, agent: int) -> Belief:
+        """
+        Belief of a single agent, backed by the bank
+        """
+        return Belief(*self.shape, log_domain=self.log_domain, shared_buffers=self.shared_buffers,
+                      buffer=self.beliefs[agent])
+
+    def new_belief(self) -> Belief:
+        """
+        Belief backed by the next unused row of the bank
+        """
+        if self.n_beliefs == len(self.beliefs):
+            raise ValueError("All beliefs of the bank are in use")
+        self.n_beliefs += 1
+        return self.belief(self.n_beliefs - 1)
+
+    def update_prior_beliefs(self) -> None:
+        """
+        Uniform prior belief for all agents
+        """
+        self.beliefs.fill(0 if self.log_domain else 1 / self.beliefs[0].size)
+
+    def update_beliefs(self,
+                       agents: np.ndarray,
+                       social_likelihoods: np.ndarray,
+                       catch_likelihoods: np.ndarray) -> None:
+        """
+        Combine the beliefs of the agents with their social and catch likelihoods in one array operation
+
+        :param agents: indices of the updated agents
+        :param social_likelihoods: array of shape (len(agents), width, height)
+        :param catch_likelihoods: array of shape (len(agents), width, height)
+        """
+        beliefs = self.beliefs[agents]
+        if self.log_domain:
+            beliefs += np.log(social_likelihoods)
+            beliefs += np.log(catch_likelihoods)
+            beliefs -= beliefs.max(axis=(1, 2), keepdims=True)
+        else:
+            beliefs *= social_likelihoods
+            beliefs *= catch_likelihoods
+            beliefs /= beliefs.sum(axis=(1, 2), keepdims=True)
+        self.beliefs[agents] = beliefs
+
+    def greedy_cells(self, agents: np.ndarray, rng=np.random) -> np.ndarray:
+        """
+        The most promising cells of the agents, ties are broken randomly
+
+        :return: array of shape (len(agents), 2)
+        """
+        return greedy_argmax(self.beliefs[agents], rng)
@@ -0,0 +1,257 @@
+import logging
+import os
+import threading
+import time
+from functools import partial
+from typing import Callable
+
+import mesa
+import tornado.escape
+import tornado.ioloop
+import tornado.websocket
+from mesa.visualization.ModularVisualization import ModularServer, SocketHandler, VisualizationElement
+
+logger = logging.getLogger(__name__)
+
+
+class SimulationWorker:
+    def __init__(self,
+                 model: mesa.Model,
+                 render: Callable,
+                 on_frame: Callable,
+                 max_fps: float = 10,
+                 playing: bool = False,
+                 on_error: Callable = None) -> None:
+        """
+        Background thread that runs the model independently of the clients. While the model plays, it is rendered
+        at most max_fps times per second and the steps in between are not rendered at all. Only the worker thread
+        touches the model once it is started.
+
+        :param model: the model
+        :param render: function rendering the model into a frame, the data of a viz_state message
+        :param on_frame: called by the worker thread with the step and the frame of every rendered frame
+        :param max_fps: maximal number of frames per second while the model plays
+        :param playing: start playing immediately
+        :param on_error: called by the worker thread with the exception if a step or the rendering fails, the worker
+            then stops and the exception is kept in worker.error
+        """
+        self.model = model
+        self.render = render
+        self.on_frame = on_frame
+        self.on_error = on_error
+        self.max_fps = max_fps
+        self.error = None
+
+        self._condition = threading.Condition()
+        self._playing = playing
+        self._pending = 0  # steps to perform even if paused, e.g. of a fast-forward
+        self._render_requested = True  # the first frame of the model
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self._thread.start()
+
+    @property
+    def playing(self) -> bool:
+        return self._playing
+
+    def _command(self, **changes) -> None:
+        with self._condition:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._condition.notify()
+
+    def play(self) -> None:
+        self._command(_playing=True)
+
+    def pause(self) -> None:
+        # the frame of the step the model paused at
+        self._command(_playing=False, _render_requested=True)
+
+    def step(self) -> None:
+        """
+        Perform a single step and render it
+        """
+        self.fast_forward(1)
+
+    def fast_forward(self, n_steps: int) -> None:
+        """
+        Perform n_steps steps as fast as possible, without rendering before the last one
+        """
+        with self._condition:
+            self._pending += n_steps
+            self._condition.notify()
+
+    def stop(self) -> None:
+        """
+        Stop the thread after the current step
+        """
+        self._command(_stopped=True)
+        self._thread.join()
+
+    def _has_work(self) -> bool:
+        active = self._playing or self._pending > 0
+        return self._stopped or self._render_requested or (active and self.model.running)
+
+    def _run(self) -> None:
+        last_render = -float("inf")
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._has_work)
+                if self._stopped:
+                    return
+                render, self._render_requested = self._render_requested, False
+                step = self.model.running and (self._playing or self._pending > 0)
+                if step and self._pending > 0:
+                    self._pending -= 1
+                    # the last step of a fast-forward is rendered
+                    render = render or self._pending == 0
+
+            try:
+                if step:
+                    self.model.step()
+                    if not self.model.running:
+                        with self._condition:
+                            self._pending = 0
+                        render = True
+
+                now = time.perf_counter()
+                if render or (step and self._pending == 0 and now - last_render >= 1 / self.max_fps):
+                    last_render = now
+                    self.on_frame(self.model.schedule.steps, self.render(self.model))
+            except Exception as error:
+                logger.exception("The simulation failed at step %d", self.model.schedule.steps)
+                with self._condition:
+                    self.error = error
+                    self._stopped = True
+                if self.on_error is not None:
+                    self.on_error(error)
+                return
+
+
+class SimulationControl(VisualizationElement):
+    local_includes = ["SimulationControl.js"]
+    local_dir = os.path.dirname(__file__)
+    js_code = "elements.push(new SimulationControl());"
+
+    def render(self, model) -> int:
+        return model.schedule.steps
+
+
+class DecoupledSocketHandler(SocketHandler):
+    def open(self):
+        self.application.connect(self)
+        super().open()
+
+    def on_close(self):
+        self.application.sockets.discard(self)
+
+    def on_message(self, message):
+        msg = tornado.escape.json_decode(message)
+        worker = self.application.worker
+
+        if msg["type"] == "get_step":
+            # a single step requested with the step button, the frame is pushed
+            if worker.error is not None:
+                self.write_message(self.application.end_message(worker.error))
+            elif not self.application.model.running:
+                self.write_message({"type": "end"})
+            else:
+                worker.step()
+        elif msg["type"] == "play":
+            worker.play()
+        elif msg["type"] == "pause":
+            worker.pause()
+        elif msg["type"] == "fast_forward":
+            worker.fast_forward(max(int(msg["steps"]), 0))
+        elif msg["type"] == "fps":
+            worker.max_fps = min(max(float(msg["fps"]), 1), self.application.max_fps)
+        elif msg["type"] == "reset":
+            # the new model pushes its first frame
+            self.application.reset_model()
+        else:
+            super().on_message(message)
+
+
+class DecoupledServer(ModularServer):
+    def __init__(self,
+                 model_cls,
+                 visualization_elements: list,
+                 name: str = "Mesa Model",
+                 model_params: dict = None,
+                 port: int = None,
+                 max_fps: float = 10):
+        """
+        ModularServer whose model runs in a background thread, see SimulationWorker. The simulation free-runs while
+        the frames are pushed to the clients at the frame rate of the client, capped at max_fps, and the frames in
+        between are dropped. The model can be fast-forwarded by a number of steps without rendering.
+
+        :param max_fps: maximal number of frames per second
+        """
+        self.max_fps = max_fps
+        self.worker = None
+        self.sockets = set()
+        self._loop = None
+        self._ended = False
+        super().__init__(model_cls, [*visualization_elements, SimulationControl()], name, model_params, port)
+        # the handler of the decoupled protocol takes precedence over the one of ModularServer
+        self.add_handlers(r".*$", [(r"/ws", DecoupledSocketHandler)])
+
+    def connect(self, socket: tornado.websocket.WebSocketHandler) -> None:
+        self._loop = tornado.ioloop.IOLoop.current()
+        self.sockets.add(socket)
+
+    def reset_model(self):
+        playing = self.worker is not None and self.worker.playing
+        if self.worker is not None:
+            self.worker.stop()
+        super().reset_model()
+        self._ended = False
+        self.worker = SimulationWorker(self.model, self._render, partial(self._on_frame, self.model),
+                                       max_fps=self.max_fps, playing=playing,
+                                       on_error=partial(self._on_error, self.model))
+
+    @staticmethod
+    def end_message(error: Exception) -> dict:
+        """
+        Message ending the simulation because of the exception, shown by the controls
+        """
+        return {"type": "end", "error": f"{type(error).__name__}: {error}"}
+
+    def _render(self, model: mesa.Model) -> list:
+        # the fishers of the event scheduler are observed
+        if hasattr(model, "materialise"):
+            model.materialise()
+        return [element.render(model) for element in self.visualization_elements]
+
+    def _on_frame(self, model: mesa.Model, step: int, frame: list) -> None:
+        # called by the worker thread, the frame is sent by the IOLoop
+        if self._loop is not None:
+            self._loop.add_callback(self._push, model, frame)
+
+    def _on_error(self, model: mesa.Model, error: Exception) -> None:
+        # called by the worker thread, the clients are told by the IOLoop
+        if self._loop is not None:
+            self._loop.add_callback(self._push_error, model, error)
+
+    def _push_error(self, model: mesa.Model, error: Exception) -> None:
+        if model is self.model:
+            self._ended = True
+            self._send([self.end_message(error)])
+
+    def _push(self, model, frame: list) -> None:
+        if model is not self.model:
+            # a frame of a model that was reset
+            return
+        messages = [{"type": "viz_state", "data": frame}]
+        if not model.running and not self._ended:
+            self._ended = True
+            messages.append({"type": "end"})
+        self._send(messages)
+
+    def _send(self, messages: list[dict]) -> None:
+        for socket in list(self.sockets):
+            try:
+                for message in messages:
+                    socket.write_message(message)
+            except tornado.websocket.WebSocketClosedError:
+                self.sockets.discard(socket)
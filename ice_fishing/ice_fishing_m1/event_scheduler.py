@@ -0,0 +1,86 @@
+import heapq
+import itertools
+from collections import Counter, defaultdict
+
+import mesa
+import numpy as np
+
+
+class EventScheduler(mesa.time.BaseScheduler):
+    def __init__(self, model: mesa.Model) -> None:
+        """
+        Scheduler that activates a fisher only at its decision times, the steps where its current action is done.
+        The steps in between are deterministic moves and fishing trials drawn at the start of the fishing bout. They
+        are performed in bulk with BaseIceFisher.advance when the fisher decides again or when its state is observed,
+        see materialise. The totals of the model count the catches in the steps they are made all the same.
+
+        The fishers deciding in the same step are activated in random order, as by RandomActivation. Agents without
+        decisions are never activated.
+        """
+        super().__init__(model)
+        self._queue = []  # (decision step, insertion counter, agent)
+        self._counter = itertools.count()
+        self._actions = {}  # agent -> [first step of the current action, number of its steps performed]
+        self._catches_at = Counter()  # step -> number of planned catches
+        self._reserved = defaultdict(int)  # cell -> planned catches not yet materialised
+
+    def add(self, agent: mesa.Agent) -> None:
+        super().add(agent)
+        if hasattr(agent, "select_next_action"):
+            heapq.heappush(self._queue, (self.steps, next(self._counter), agent))
+
+    def catch_up(self, agent: mesa.Agent, step: int) -> None:
+        """
+        Perform the steps of the current action of the agent before the given step
+        """
+        action = self._actions.get(agent)
+        if action is None:
+            return
+        start, n_done = action
+        if step - start > n_done:
+            total_catch = agent.total_catch
+            agent.advance(n_done, step - start)
+            action[1] = step - start
+            if agent.total_catch > total_catch:
+                self._reserved[agent.pos] -= agent.total_catch - total_catch
+
+    def materialise(self, agents) -> None:
+        """
+        Bring the state of the agents up to date before it is observed in the current step
+        """
+        for agent in agents:
+            self.catch_up(agent, self.steps)
+
+    def _plan_fishing_bout(self, agent: mesa.Agent) -> None:
+        # fish caught by the other agents in the cell, but not yet taken from the resource map, are not available
+        n_fish = self.model.resource_map[agent.pos] - self._reserved[agent.pos]
+        outcomes = agent.plan_fishing_bout(n_fish)
+        n_caught = int(outcomes.sum())
+        if n_caught > 0:
+            self._reserved[agent.pos] += n_caught
+            # the first step of the bout is only drilling
+            self._catches_at.update((self.steps + 1 + np.flatnonzero(outcomes)).tolist())
+
+    def step(self) -> None:
+        due = []
+        while self._queue and self._queue[0][0] == self.steps:
+            agent = heapq.heappop(self._queue)[2]
+            if agent.unique_id in self._agents:
+                due.append(agent)
+        self.model.random.shuffle(due)
+
+        for agent in due:
+            self.catch_up(agent, self.steps)
+            agent.select_next_action()
+            # the new action starts in this step
+            self._actions[agent] = [self.steps, 0]
+            if agent.state == "fishing":
+                self._plan_fishing_bout(agent)
+            heapq.heappush(self._queue, (self.steps + agent.action_duration(), next(self._counter), agent))
+
+        n_caught = self._catches_at.pop(self.steps, 0)
+        self.model.total_catch += n_caught
+        self.model.remaining_fish -= n_caught
+
+        self.steps += 1
+        self.time += 1
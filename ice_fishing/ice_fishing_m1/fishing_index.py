@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+import numpy as np
+
+from .utils.utils import catch_rate
+
+
+class FishingIndex:
+    def __init__(self, capacity: int = 16, shape: tuple[int, int] = None) -> None:
+        """
+        Spatial index of the agents that are currently fishing, stored in compact arrays
+
+        :param capacity: initial number of slots, grows when needed
+        :param shape: shape of the grid, if given the index maintains the best_catch raster for best_within
+        """
+        self.best_catch = np.zeros(shape, dtype=int) if shape is not None else None  # most bout catches per cell
+        self._cell_agents = defaultdict(set)
+        self.agents = []
+        self.slots = {}
+        self.positions = np.zeros((capacity, 2), dtype=int)
+        self.catch_rates = np.zeros(capacity)
+        self.n_catches = np.zeros(capacity, dtype=int)  # number of catches in the current fishing bout
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+    def __contains__(self, agent) -> bool:
+        return agent in self.slots
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self.positions)
+        self.positions = np.resize(self.positions, (capacity, 2))
+        self.catch_rates = np.resize(self.catch_rates, capacity)
+        self.n_catches = np.resize(self.n_catches, capacity)
+
+    def add(self, agent) -> None:
+        """
+        Add a fishing agent at its current position
+        """
+        if len(self.agents) == len(self.positions):
+            self._grow()
+        slot = len(self.agents)
+        self.agents.append(agent)
+        self.slots[agent] = slot
+        self.positions[slot] = agent.pos
+        self.n_catches[slot] = 0
+        if self.best_catch is not None:
+            self._cell_agents[agent.pos].add(agent)
+        self.update_catches(agent)
+
+    def remove(self, agent) -> None:
+        """
+        Remove an agent by moving the last agent into its slot
+        """
+        slot = self.slots[agent]
+        if self.best_catch is not None:
+            cell = self.position(slot)
+            self._cell_agents[cell].discard(agent)
+            if self.n_catches[slot] == self.best_catch[cell]:
+                self._refresh_cell(cell)
+        del self.slots[agent]
+        last = len(self.agents) - 1
+        if slot != last:
+            moved = self.agents[last]
+            self.agents[slot] = moved
+            self.slots[moved] = slot
+            self.positions[slot] = self.positions[last]
+            self.catch_rates[slot] = self.catch_rates[last]
+            self.n_catches[slot] = self.n_catches[last]
+        self.agents.pop()
+
+    def update_catches(self, agent) -> None:
+        """
+        Refresh the catch statistics of the agent from its catch history
+        """
+        slot = self.slots[agent]
+        self.catch_rates[slot] = catch_rate(agent.last_catches)
+        previous, self.n_catches[slot] = self.n_catches[slot], agent.last_catches.total
+        if self.best_catch is not None:
+            cell = self.position(slot)
+            if self.n_catches[slot] >= self.best_catch[cell]:
+                self.best_catch[cell] = self.n_catches[slot]
+            elif previous == self.best_catch[cell]:
+                # a new bout of the best agent of the cell
+                self._refresh_cell(cell)
+
+    def _refresh_cell(self, cell: tuple[int, int]) -> None:
+        self.best_catch[cell] = max((self.n_catches[self.slots[a]] for a in self._cell_agents[cell]), default=0)
+
+    def within(self, pos: tuple[int, int], radius: int, include_center: bool = True) -> np.ndarray:
+        """
+        Slots of the fishing agents in the Moore neighbourhood of the position
+
+        :param pos: center of the neighbourhood
+        :param radius: Chebyshev radius of the neighbourhood
+        :param include_center: include the agents fishing in the center cell
+        :return: array of slots
+        """
+        distance = np.abs(self.positions[:len(self.agents)] - pos).max(axis=1)
+        mask = distance <= radius
+        if not include_center:
+            mask &= distance > 0
+        return np.flatnonzero(mask)
+
+    def best_within(self, pos: tuple[int, int], radius: int, include_center: bool = True) -> tuple[int, int]:
+        """
+        Cell of the fishing agent with the most catches in its bout in the Moore neighbourhood of the position, from
+        the best_catch raster in time independent of the number of agents
+
+        :return: the first best cell in grid order, None if no agent in the neighbourhood caught a fish
+        """
+        x, y = pos
+        x0, y0 = max(x - radius, 0), max(y - radius, 0)
+        window = self.best_catch[x0:x + radius + 1, y0:y + radius + 1]
+        if not include_center:
+            window = window.copy()
+            window[x - x0, y - y0] = 0
+        i = np.argmax(window)
+        if window.flat[i] <= 0:
+            return None
+        dx, dy = np.unravel_index(i, window.shape)
+        return int(x0 + dx), int(y0 + dy)
+
+    def position(self, slot: int) -> tuple[int, int]:
+        x, y = self.positions[slot]
+        return int(x), int(y)
@@ -0,0 +1,197 @@
+import numpy as np
+from scipy.special import logsumexp
+
+from .utils.discrete_bayes_filter import normalize
+from .utils.utils import disk_likelihood, greedy_argmax, stamp_disk
+
+
+class HierarchicalBelief:
+    def __init__(self,
+                 width: int,
+                 height: int,
+                 block_size: int = 16,
+                 attention_radius: int = 16,
+                 dtype: np.dtype = np.float64) -> None:
+        """
+        Log-domain belief of an agent at two resolutions: a coarse grid with one value per block of
+        block_size x block_size cells for the whole lake, and full-resolution tiles of the blocks the agent attends
+        to, i.e. the blocks within attention_radius of its measurement locations. The cells of a block without a
+        tile share one value. When the agent stops attending to a block, its tile is collapsed to the mean belief of
+        the block.
+
+        The memory and the cost of an update scale with the number of blocks and with the attended area instead of
+        the size of the lake. It has the measurement API the fishers use with Belief, the exact mode.
+
+        :param width: grid width
+        :param height: grid height
+        :param block_size: edge length of a block in cells
+        :param attention_radius: blocks within this distance of a measurement location get a tile, at least the radius
+            of the social and catch disks
+        """
+        self.shape = (width, height)
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.attention_radius = attention_radius
+        self.coarse_shape = (-(-width // block_size), -(-height // block_size))
+
+        # log belief of each cell of the blocks without tile, the values of the blocks with tile are not used
+        self._coarse = np.zeros(self.coarse_shape, dtype=self.dtype)
+        self._tiles = {}  # block -> log belief of the cells of the block
+
+        # last measurements
+        self._social_field = None
+        self._exclude = None
+        self._social_locs = ()  # locations of the fishing agents of the social field at the last update
+        self._catch_locs = ()
+        self._catch_rates = ()
+        self._catch_radius = 3
+
+    @property
+    def nbytes(self) -> int:
+        return self._coarse.nbytes + sum(tile.nbytes for tile in self._tiles.values())
+
+    def _region(self, block: tuple[int, int]) -> tuple[slice, slice]:
+        i, j = block
+        b = self.block_size
+        return slice(i * b, min((i + 1) * b, self.shape[0])), slice(j * b, min((j + 1) * b, self.shape[1]))
+
+    def _blocks_near(self, locs: tuple[tuple[int, int], ...], radius: int) -> set[tuple[int, int]]:
+        blocks = set()
+        b = self.block_size
+        for x, y in locs:
+            i_min, i_max = max(x - radius, 0) // b, min(x + radius, self.shape[0] - 1) // b
+            j_min, j_max = max(y - radius, 0) // b, min(y + radius, self.shape[1] - 1) // b
+            blocks.update((i, j) for i in range(i_min, i_max + 1) for j in range(j_min, j_max + 1))
+        return blocks
+
+    def _attend(self, blocks: set[tuple[int, int]]) -> None:
+        """
+        Keep tiles for exactly the given blocks
+        """
+        for block in [block for block in self._tiles if block not in blocks]:
+            tile = self._tiles.pop(block)
+            # the same total belief of the block, spread uniformly
+            self._coarse[block] = logsumexp(tile) - np.log(tile.size)
+        for block in blocks:
+            if block not in self._tiles:
+                x, y = self._region(block)
+                self._tiles[block] = np.full((x.stop - x.start, y.stop - y.start), self._coarse[block],
+                                             dtype=self.dtype)
+
+    def _disks(self, block: tuple[int, int], locs: tuple[tuple[int, int], ...], weights: tuple[float, ...],
+               radius: int) -> np.ndarray:
+        # likelihood of disks around the locations within the block
+        x, y = self._region(block)
+        out = np.full((x.stop - x.start, y.stop - y.start), 1e-5, dtype=self.dtype)
+        for (loc_x, loc_y), weight in zip(locs, weights):
+            stamp_disk(out, loc_x - x.start, loc_y - y.start, radius, weight)
+        return out
+
+    def _normalize(self) -> None:
+        # keep the maximum at 0 instead of normalizing
+        maximum = max([self._coarse.max()] + [tile.max() for tile in self._tiles.values()])
+        self._coarse -= maximum
+        for tile in self._tiles.values():
+            tile -= maximum
+
+    def update_prior_belief(self,
+                            locs: tuple[tuple[int, int], ...] = None,
+                            radius: int = 3) -> None:
+        self._coarse.fill(np.log(1e-5))
+        self._tiles.clear()
+        if locs is not None:
+            self._attend(self._blocks_near(locs, radius))
+            for block, tile in self._tiles.items():
+                tile[...] = np.log(self._disks(block, locs, (1.0,) * len(locs), radius))
+        self._normalize()
+
+    def use_social_field(self, social_field, exclude: tuple[int, int] = None) -> None:
+        """
+        Take the social likelihood from the social field shared by all agents
+
+        :param social_field: SocialField of the model
+        :param exclude: cell whose fishing agents are not taken into account
+        """
+        self._social_field = social_field
+        self._exclude = exclude
+        self._social_locs = () if social_field is None else social_field.locations(exclude)
+
+    def update_catch_likelihood(self,
+                                loc: tuple[tuple[int, int], ...],
+                                catch_rates: tuple[float, ...],
+                                radius: int = 3) -> None:
+        self._catch_locs = loc
+        self._catch_rates = catch_rates
+        self._catch_radius = radius
+
+    def apply_likelihoods(self) -> None:
+        """
+        Combine the current belief with the social and catch likelihoods, block-averaged likelihoods for the blocks
+        without tile and full-resolution ones for the tiles
+        """
+        field = self._social_field
+        attended = self._blocks_near(self._catch_locs, max(self.attention_radius, self._catch_radius))
+        if self._exclude is not None and field is not None:
+            attended |= self._blocks_near([self._exclude], field.radius)
+        self._attend(attended)
+
+        # the catch disks are all within the tiles
+        self._coarse += np.log(1e-5)
+        if field is not None:
+            self._coarse += np.log(field.weight * field.block_means(self.block_size) + 1e-5)
+
+        for block, tile in self._tiles.items():
+            tile += np.log(self._disks(block, self._catch_locs, self._catch_rates, self._catch_radius))
+            if field is not None:
+                x, y = self._region(block)
+                social = field.weight * field.field[x, y] + 1e-5
+                if self._exclude is not None and field.counts[self._exclude] > 0:
+                    stamp_disk(social, self._exclude[0] - x.start, self._exclude[1] - y.start, field.radius,
+                               -field.counts[self._exclude] * field.weight)
+                tile += np.log(social)
+        self._normalize()
+
+    def greedy_cell(self, rng=np.random) -> tuple[int, int]:
+        """
+        The most promising cell, ties are broken randomly: the best block first, then the best cell of the block
+        """
+        block_max = self._coarse.copy()
+        for block, tile in self._tiles.items():
+            block_max[block] = tile.max()
+        block = tuple(int(v) for v in greedy_argmax(block_max[None], rng)[0])
+
+        x, y = self._region(block)
+        if block in self._tiles:
+            dx, dy = greedy_argmax(self._tiles[block][None], rng)[0]
+        else:
+            # all cells of the block are equally good
+            dx, dy = int(rng.random() * (x.stop - x.start)), int(rng.random() * (y.stop - y.start))
+        return int(x.start + dx), int(y.start + dy)
+
+    @property
+    def log_belief(self) -> np.ndarray:
+        """
+        Full-resolution logarithm of the belief up to an additive constant, for the analysis and the visualisation
+        """
+        b = self.block_size
+        log_belief = np.repeat(np.repeat(self._coarse, b, axis=0), b, axis=1)[:self.shape[0], :self.shape[1]]
+        for block, tile in self._tiles.items():
+            log_belief[self._region(block)] = tile
+        return log_belief
+
+    @property
+    def belief(self) -> np.ndarray:
+        return normalize(np.exp(self.log_belief))
+
+    @property
+    def social_likelihood(self) -> np.ndarray:
+        out = np.zeros(self.shape, dtype=self.dtype)
+        if self._social_field is None:
+            return disk_likelihood((), (), 1, out)
+        field = self._social_field
+        return disk_likelihood(self._social_locs, (field.weight,) * len(self._social_locs), field.radius, out)
+
+    @property
+    def catch_likelihood(self) -> np.ndarray:
+        out = np.zeros(self.shape, dtype=self.dtype)
+        return disk_likelihood(self._catch_locs, self._catch_rates, self._catch_radius, out)
@@ -0,0 +1,105 @@
+import functools
+import time
+from collections import defaultdict
+from typing import Callable
+
+import numpy as np
+
+# timed methods of the fishers, step includes the others
+TIMED_AGENT_METHODS = ("step", "select_next_action", "update_belief", "move", "fish")
+
+
+class StepStats:
+    """
+    Accumulated wall times, call counts and counters of an instrumented model
+    """
+
+    def __init__(self) -> None:
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+
+    def reset(self) -> None:
+        self.times.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    def as_dict(self) -> dict[str, float]:
+        """
+        Flat view of the statistics, "<phase> time" in seconds, "<phase> calls" and the counters.
+        The scheduling time is the time of the scheduler without the steps of the agents.
+        """
+        stats = {}
+        for name in self.times:
+            stats[f"{name} time"] = self.times[name]
+            stats[f"{name} calls"] = self.calls[name]
+        if "schedule" in self.times:
+            stats["scheduling time"] = self.times["schedule"] - self.times.get("agent_step", 0.0)
+        stats.update(self.counters)
+        return stats
+
+    def __repr__(self) -> str:
+        lines = [f"{name:25s} {value:.6g}" for name, value in self.as_dict().items()]
+        return "\n".join(["StepStats"] + lines)
+
+
+def _timed(stats: StepStats, name: str, func: Callable) -> Callable:
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.times[name] += perf_counter() - start
+            stats.calls[name] += 1
+    return wrapper
+
+
+def _counted(stats: StepStats, name: str, func: Callable) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats.counters[name] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _wrap(obj, method: str, wrapper: Callable, stats: StepStats, name: str) -> None:
+    # the wrapper is an attribute of the instance, uninstrumented instances are not affected at all
+    setattr(obj, method, wrapper(stats, name, getattr(obj, method)))
+
+
+def instrument(model, columns: bool = False) -> StepStats:
+    """
+    Instrument the phases of the steps of an IceFishingModel by wrapping the methods of its instances
+
+    :param model: model with all its fishers
+    :param columns: add the statistics to the DataCollector of the model
+    :return: the statistics, updated while the model runs
+    """
+    stats = StepStats()
+    _wrap(model.schedule, "step", _timed, stats, "schedule")
+    _wrap(model.datacollector, "collect", _timed, stats, "data_collection")
+    for agent in model.fishers:
+        for method in TIMED_AGENT_METHODS:
+            _wrap(agent, method, _timed, stats, "agent_step" if method == "step" else method)
+        if agent.belief is not None:
+            _wrap(agent.belief, "apply_likelihoods", _counted, stats, "belief_normalizations")
+    _wrap(model.fishing_index, "within", _counted, stats, "neighbour_queries")
+    _wrap(model.grid, "get_neighborhood", _counted, stats, "neighbour_queries")
+
+    if columns:
+        names = [f"{phase} {kind}" for phase in ("agent_step", *TIMED_AGENT_METHODS[1:], "schedule")
+                 for kind in ("time", "calls")]
+        names += ["scheduling time", "belief_normalizations", "neighbour_queries"]
+        datacollector = model.datacollector
+        n_collected = len(next(iter(datacollector.model_vars.values()), []))
+        for name in names:
+            datacollector.model_reporters[name] = functools.partial(_stat, stats, name)
+            datacollector.model_vars[name] = [np.nan] * n_collected
+    return stats
+
+
+def _stat(stats: StepStats, name: str, model) -> float:
+    return stats.as_dict().get(name, 0)
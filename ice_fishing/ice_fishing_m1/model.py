@@ -1,13 +1,42 @@
+from collections import defaultdict
+from functools import partial
+from typing import Callable
+
 import mesa
 import numpy as np
 from mesa.space import MultiGrid
 
 from .agent_fisher import BaseIceFisher, ImitatorIceFisher, GreedyBayesFisher
-from .agent_fish import Fish, BeliefHolderAgent
-from .utils.utils import generate_resource_map, mean_catch_ratio
+from .belief_bank import BeliefBank
+from .event_scheduler import EventScheduler
+from .fishing_index import FishingIndex
+from .hierarchical_belief import HierarchicalBelief
+from .instrumentation import instrument
+from .resource import ResourceDynamics
+from .social_field import SocialField
+from .utils.cache import cached_resource_map
+from .utils.kernels import get_backend
+from .utils.utils import sample_gaussian_resource_map
+
+AGENT_MODELS = {
+    "random": BaseIceFisher,
+    "imitator": ImitatorIceFisher,
+    "greedy_bayesian": GreedyBayesFisher,
+}
+
+
+def _mean_catch_ratio(model: mesa.Model, n_samples: int) -> float:
+    """
+    Mean catch of the fishers relative to the number of fish in the lake at the start
+    """
+    return model.total_catch / max(len(model.fishers), 1) / n_samples
 
 
 class IceFishingModel(mesa.Model):
+    # parameters that take effect when they are changed after the construction, e.g. in a fork of a snapshot
+    runtime_attributes = ("fish_catch_threshold", "stop_fish_fraction", "plateau_window", "plateau_tolerance",
+                          "stop_condition")
+
     def __init__(self,
                  width: int = 100,
                  height: int = 100,
@@ -17,89 +46,266 @@ class IceFishingModel(mesa.Model):
                  fish_patch_n_samples: int = 100_000,
                  fish_catch_threshold: int = 100,
                  agent_model: str = "random",
-                 server: bool = False):
+                 compact_beliefs: bool = False,
+                 belief_mode: str = "exact",
+                 belief_block_size: int = 16,
+                 record_beliefs: bool = False,
+                 resource_map: str = "blobs",
+                 resource_map_cache_dir: str = None,
+                 resource_map_seed: int = 42,
+                 seed: int = None,
+                 instrumentation: bool = False,
+                 instrumentation_columns: bool = False,
+                 scheduler: str = "random",
+                 kernel_backend: str = "numpy",
+                 stop_fish_fraction: float = None,
+                 plateau_window: int = None,
+                 plateau_tolerance: float = 1e-9,
+                 stop_condition: Callable[[mesa.Model], bool] = None,
+                 resource_dynamics: ResourceDynamics = None):
+        """
+        :param fish_patch_std: spread of the fish patches of the "blobs" resource map, must be left at its default
+            for the "gaussian" resource map
+        :param compact_beliefs: float32 log-domain beliefs with shared likelihood buffers, only in the exact belief mode
+        :param belief_mode: "exact" full-resolution beliefs, or "hierarchical" beliefs with a coarse grid and
+            full-resolution tiles around the measurements, see HierarchicalBelief
+        :param belief_block_size: block size of the hierarchical beliefs
+        :param resource_map_seed: seed of the resource map, the same lake for all runs by default, or derived from the
+            model seed if None
+        :param seed: seed of all random number generators of the model, a fresh seed if None. The seed of an unseeded
+            run is available as model.seed.
+        :param instrumentation: time the phases of the steps and count the neighbour queries and the belief
+            normalizations in model.stats, see instrumentation.instrument
+        :param instrumentation_columns: also collect the statistics with the DataCollector, only with instrumentation
+        :param scheduler: "random" activates all agents in every step in random order, "event" activates the fishers
+            only at their decision times and performs their moves and fishing trials in bulk, see EventScheduler
+        :param kernel_backend: "numpy", "numba" for the compiled kernels of the hot loops, or "auto" for numba if it is
+            installed, see utils.kernels. Both backends give identical runs for the same seed.
+        :param stop_fish_fraction: stop when at most this fraction of the fish of the lake is left
+        :param plateau_window: stop when the mean catch ratio changed by at most plateau_tolerance over this number of
+            steps, once the fishers caught fish
+        :param plateau_tolerance: see plateau_window
+        :param stop_condition: stop when this function of the model returns True, checked after every step
+        :param resource_dynamics: regrowth and movement of the fish in every step, a static lake if None. Not with the
+            event scheduler, whose fishing bouts are drawn for a static lake.
+        """
+        if agent_model not in AGENT_MODELS:
+            raise ValueError(f"Unknown agent model: {agent_model}")
+        agent_class = AGENT_MODELS[agent_model]
+        if instrumentation_columns and not instrumentation:
+            raise ValueError("instrumentation_columns requires instrumentation")
+
         self.current_id = 0
-        self.server = server
+        self.kernels = get_backend(kernel_backend)
+        map_seed = self.reseed(seed)
+        if resource_map_seed is None:
+            resource_map_seed = int(map_seed.generate_state(1)[0])
+
         self.n_agents = n_agents
         self.fish_catch_threshold = fish_catch_threshold
+        # maintain beliefs of the agents that do not use them, e.g. for the analysis
+        self.record_beliefs = record_beliefs
+        if belief_mode not in ("exact", "hierarchical"):
+            raise ValueError(f"Unknown belief mode: {belief_mode}")
+        if compact_beliefs and belief_mode == "hierarchical":
+            raise ValueError("Compact beliefs are only available in the exact belief mode")
+        self.belief_mode = belief_mode
+        self.belief_block_size = belief_block_size
+        # float32 log-domain beliefs with likelihood buffers shared by all agents
+        belief_options = dict(dtype=np.float32, log_domain=True, shared_buffers=True) if compact_beliefs else {}
+        uses_bank = (agent_class.uses_belief or record_beliefs) and belief_mode == "exact"
+        n_beliefs = n_agents if uses_bank else 0
+        self.belief_bank = BeliefBank(n_beliefs, width, height, **belief_options)
         self.grid = MultiGrid(width, height, torus=False)
+        self.social_field = SocialField(width, height, kernels=self.kernels)
+        self.fishing_index = FishingIndex(shape=(width, height))
         self.datacollector = mesa.datacollection.DataCollector(
             model_reporters={
-                "Mean catch ratio": lambda m: mean_catch_ratio(
-                    [agent.total_catch for agent in m.schedule.agents if isinstance(agent, BaseIceFisher)],
-                    fish_patch_n_samples),
+                "Mean catch ratio": partial(_mean_catch_ratio, n_samples=fish_patch_n_samples),
             },
         )
-        self.schedule = mesa.time.RandomActivation(self)
+        if scheduler == "random":
+            self.schedule = mesa.time.RandomActivation(self)
+        elif scheduler == "event":
+            self.schedule = EventScheduler(self)
+        else:
+            raise ValueError(f"Unknown scheduler: {scheduler}")
+        if resource_dynamics is not None and scheduler == "event":
+            raise ValueError("The event scheduler does not support resource dynamics")
+        self._lazy = scheduler == "event"
         self.running = True
 
+        # agents of each type, the fishers are the agents of the agent model
+        self.agents_by_type = defaultdict(list)
+        self.fishers = self.agents_by_type[agent_class]
+
         # Create agents
         for _ in range(self.n_agents):
-            if agent_model == "random":
-                a = BaseIceFisher(self.next_id(), self, "initial", max_fishing_time=max_fishing_time)
-            elif agent_model == "imitator":
-                a = ImitatorIceFisher(self.next_id(), self, "initial", max_fishing_time=max_fishing_time)
-            elif agent_model == "greedy_bayesian":
-                a = GreedyBayesFisher(self.next_id(), self, "initial", max_fishing_time=max_fishing_time)
-            else:
-                raise ValueError(f"Unknown agent model: {agent_model}")
-            self.schedule.add(a)
+            a = agent_class(self.next_id(), self, "initial", max_fishing_time=max_fishing_time)
 
             # Add the agent to a random grid cell
             # x = self.random.randrange(self.grid.width)
             # y = self.random.randrange(self.grid.height)
             x = width // 2
             y = height // 2
-            self.grid.place_agent(a, (x, y))
-
-        self.resource_map = generate_resource_map(width, height, cluster_std=fish_patch_std,
-                                                  n_samples=fish_patch_n_samples)
-
-        if self.server:
-            # this is needed to visualise the resource map in the server
-            self._initialise_fish()
-            self._update_fish_catch(p_catch=self.resource_map)
-            self._update_belief_holder()
-
-    def _initialise_fish(self):
-        # add uniform circle of fish in the middle
-        for x in range(self.grid.width):
-            for y in range(self.grid.height):
-                f = Fish(self.next_id(), self, p_catch=0)
-                self.schedule.add(f)
-                self.grid.place_agent(f, (x, y))
-
-                # add belief holder
-                b = BeliefHolderAgent(self.next_id(), self)
-                self.schedule.add(b)
-                self.grid.place_agent(b, (x, y))
-
-    def _update_fish_catch(self, p_catch: np.ndarray):
-        for agent in self.schedule.agents:
-            if isinstance(agent, Fish):
-                agent.p_catch = p_catch[agent.pos]
-
-    def _update_belief_holder(self):
-        # find agent with id 0
-        agent_0 = [agent for agent in self.schedule.agents if agent.unique_id == 1 and hasattr(agent, 'belief')][0]
-
-        for agent in self.schedule.agents:
-            if isinstance(agent, BeliefHolderAgent):
-                agent.social_likelihood = agent_0.belief.social_likelihood[agent.pos]
-                agent.catch_likelihood = agent_0.belief.catch_likelihood[agent.pos]
-                agent.belief = agent_0.belief.belief[agent.pos]
+            self.add_agent(a, (x, y))
+
+        if resource_map == "blobs":
+            self.resource_map = cached_resource_map(width, height, cluster_std=fish_patch_std,
+                                                    n_samples=fish_patch_n_samples, random_seed=resource_map_seed,
+                                                    cache_dir=resource_map_cache_dir)
+        elif resource_map == "gaussian":
+            # a single patch of a fixed spread
+            if fish_patch_std != 0.4:
+                raise ValueError("fish_patch_std is not used by the gaussian resource map")
+            self.resource_map = sample_gaussian_resource_map(width, height, n_samples=fish_patch_n_samples,
+                                                             random_seed=resource_map_seed)
+        else:
+            raise ValueError(f"Unknown resource map: {resource_map}")
+
+        # running catch accounting, updated by record_catch
+        self.total_catch = 0
+        self.remaining_fish = int(self.resource_map.sum())
+
+        self.resource_dynamics = resource_dynamics
+        if resource_dynamics is not None:
+            capacity = resource_dynamics.carrying_capacity
+            self.carrying_capacity = self.resource_map.copy() if capacity is None else \
+                np.broadcast_to(np.asarray(capacity, dtype=float), self.resource_map.shape)
+
+        # stopping criteria, model.running is False after the step that met one of them
+        self.initial_fish = self.remaining_fish
+        self.stop_fish_fraction = stop_fish_fraction
+        self.plateau_window = plateau_window
+        self.plateau_tolerance = plateau_tolerance
+        self.stop_condition = stop_condition
+        self.stop_reason = None
+
+        self.stats = instrument(self, columns=instrumentation_columns) if instrumentation else None
+
+    def reseed(self, seed: int = None) -> np.random.SeedSequence:
+        """
+        Seed all random number generators of the model, e.g. for the variants forked from a snapshot
+
+        :param seed: seed, a fresh seed if None, available as model.seed
+        :return: the seed sequence of the resource map
+        """
+        # independent streams for the numpy generator, the mesa generator and the resource map
+        seed_sequence = np.random.SeedSequence(seed)
+        self.seed = seed_sequence.entropy
+        rng_seed, random_seed, map_seed = seed_sequence.spawn(3)
+        self.rng = np.random.default_rng(rng_seed)
+        self.random.seed(int(random_seed.generate_state(1)[0]))
+        return map_seed
+
+    def add_agent(self, agent: mesa.Agent, pos: tuple[int, int]):
+        """
+        Add the agent to the scheduler, the grid and the registry of its type
+        """
+        self.schedule.add(agent)
+        self.grid.place_agent(agent, pos)
+        self.agents_by_type[type(agent)].append(agent)
+
+    def new_belief(self):
+        """
+        Belief for a new agent, from the belief bank in the exact mode
+        """
+        if self.belief_mode == "hierarchical":
+            return HierarchicalBelief(self.grid.width, self.grid.height, block_size=self.belief_block_size)
+        return self.belief_bank.new_belief()
+
+    def record_catch(self, agent: BaseIceFisher, n_fish: int = 1):
+        """
+        Account for fish caught by the agent in its current cell. The event scheduler counts the catches in the
+        totals already in the steps they are made, the resource map is depleted when they are materialised.
+        """
+        # depletion of the resource
+        self.resource_map[agent.pos] -= n_fish
+        if not self._lazy:
+            self.total_catch += n_fish
+            self.remaining_fish -= n_fish
+
+    def materialise(self, agents: list[BaseIceFisher] = None):
+        """
+        Bring the state of the fishers up to date before it is observed, all fishers if None. Only the event
+        scheduler advances the fishers lazily.
+        """
+        if self._lazy:
+            self.schedule.materialise(self.fishers if agents is None else agents)
+
+    def materialise_fishing(self, slots: np.ndarray):
+        """
+        Bring the catch statistics of the fishing agents in the slots of the fishing index up to date
+        """
+        if self._lazy:
+            self.schedule.materialise([self.fishing_index.agents[slot] for slot in slots])
+
+    def materialise_window(self, pos: tuple[int, int], radius: int):
+        """
+        Bring the catch statistics of the fishing agents in the Moore neighbourhood of the position up to date
+        """
+        if self._lazy:
+            self.materialise_fishing(self.fishing_index.within(pos, radius))
+
+    def fisher_action_selected(self, agent: BaseIceFisher, previous_state: str):
+        """
+        Keep the shared social information and the fishing index in sync with the state of the fisher
+        """
+        if previous_state == "fishing" and agent.state != "fishing":
+            self.social_field.remove(agent.pos)
+            self.fishing_index.remove(agent)
+        elif previous_state != "fishing" and agent.state == "fishing":
+            self.social_field.add(agent.pos)
+            self.fishing_index.add(agent)
+        elif agent.state == "fishing":
+            # a new fishing bout in the same cell
+            self.fishing_index.update_catches(agent)
+
+    def update_resources(self):
+        """
+        Evolve the resource map by the resource dynamics, the whole map at once
+        """
+        self.resource_dynamics.step(self.resource_map, self.carrying_capacity, self.rng)
+        self.remaining_fish = int(self.resource_map.sum())
 
     def step(self):
         self.schedule.step()
+        if self.resource_dynamics is not None:
+            self.update_resources()
 
         # collect data
         self.datacollector.collect(self)
 
-        if self.server:
-            # this is needed to visualise the resource map in the server
-            self._update_fish_catch(p_catch=self.resource_map)
-            self._update_belief_holder()
+        self.check_stopping()
+
+    def check_stopping(self) -> None:
+        """
+        Stop the model if one of the stopping criteria is met, the criterion is stored in model.stop_reason
+        """
+        if not self.running:
+            return
+        if self.stop_fish_fraction is not None and self.remaining_fish <= self.stop_fish_fraction * self.initial_fish:
+            self.stop_reason = "depleted"
+        elif self.plateau_window is not None and self._catch_ratio_plateau():
+            self.stop_reason = "plateau"
+        elif self.stop_condition is not None and self.stop_condition(self):
+            self.stop_reason = "condition"
+        self.running = self.stop_reason is None
+
+    def _catch_ratio_plateau(self) -> bool:
+        ratios = self.datacollector.model_vars["Mean catch ratio"]
+        # the ratio stays at 0 until the first catch
+        if self.total_catch == 0 or len(ratios) <= self.plateau_window:
+            return False
+        window = ratios[-self.plateau_window - 1:]
+        return max(window) - min(window) <= self.plateau_tolerance
 
     def run_model(self, step_count: int = 100) -> None:
+        """
+        Run the given number of steps, or until the model stops. The collected data of a stopped model ends at its
+        last step, sweep carries the final values forward up to max_steps.
+        """
         for _ in range(step_count):
+            if not self.running:
+                return
             self.step()
@@ -0,0 +1,277 @@
+import mesa
+import numpy as np
+
+from .belief_bank import BeliefBank
+from .social_field import SocialField
+from .utils.cache import cached_resource_map
+from .utils.utils import mean_catch_ratio, sample_gaussian_resource_map, stamp_disk
+
+# state codes of the fishers
+INITIAL, MOVING, FISHING = 0, 1, 2
+STATES = ("initial", "moving", "fishing")
+
+
+class VectorizedIceFishingModel(mesa.Model):
+    # number of belief updates computed in one array operation, bounds the memory of the likelihoods
+    belief_chunk_size = 64
+
+    def __init__(self,
+                 width: int = 100,
+                 height: int = 100,
+                 n_agents: int = 5,
+                 max_fishing_time: int = 10,
+                 fish_patch_std: int = 0.4,
+                 fish_patch_n_samples: int = 100_000,
+                 fish_catch_threshold: int = 100,
+                 agent_model: str = "random",
+                 catch_window: int = 50,
+                 resource_map: str = "blobs",
+                 resource_map_cache_dir: str = None,
+                 seed: int = None):
+        """
+        Ice fishing model with all fishers stored in arrays and advanced in batched array operations.
+
+        The fishers follow the state machine of BaseIceFisher, but all fishers decide on the state of the model
+        at the beginning of the step instead of one after another in random order.
+
+        :param fish_patch_std: spread of the fish patches of the "blobs" resource map, must be left at its default
+            for the "gaussian" resource map
+        :param catch_window: number of catches in a fishing bout used to estimate the catch rate
+        :param resource_map: "blobs" for four fish patches or "gaussian" for a single patch
+        :param resource_map_cache_dir: directory of the resource maps cache shared between processes
+        :param seed: seed of the model random number generator
+        """
+        if agent_model not in ("random", "imitator", "greedy_bayesian"):
+            raise ValueError(f"Unknown agent model for the vectorized engine: {agent_model}")
+
+        self.n_agents = n_agents
+        self.agent_model = agent_model
+        self.max_fishing_time = max_fishing_time
+        self.fish_catch_threshold = fish_catch_threshold
+        self.catch_window = catch_window
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.datacollector = mesa.datacollection.DataCollector(
+            model_reporters={
+                "Mean catch ratio": lambda m: mean_catch_ratio(m.total_catch, fish_patch_n_samples),
+            },
+        )
+        # the scheduler has no agents, it only counts the steps
+        self.schedule = mesa.time.BaseScheduler(self)
+        self.running = True
+
+        # all agents start in the middle of the lake
+        self.pos = np.tile([width // 2, height // 2], (n_agents, 1))
+        self.destination = self.pos.copy()
+        self.state = np.full(n_agents, INITIAL)
+        self.fishing_time = np.zeros(n_agents, dtype=int)
+        self.total_catch = np.zeros(n_agents, dtype=int)
+        # ring buffers with the outcomes of the last catch_window fishing trials of the bout, as in CatchHistory
+        self.catch_windows = np.zeros((n_agents, catch_window), dtype=np.int8)
+        self.window_catches = np.zeros(n_agents, dtype=int)  # catches within the catch window of the bout
+        self.bout_trials = np.zeros(n_agents, dtype=int)  # all fishing trials of the bout
+        self.bout_catches = np.zeros(n_agents, dtype=int)  # all catches of the bout
+
+        if resource_map == "blobs":
+            self.resource_map = cached_resource_map(width, height, cluster_std=fish_patch_std,
+                                                    n_samples=fish_patch_n_samples, cache_dir=resource_map_cache_dir)
+        elif resource_map == "gaussian":
+            # a single patch of a fixed spread
+            if fish_patch_std != 0.4:
+                raise ValueError("fish_patch_std is not used by the gaussian resource map")
+            self.resource_map = sample_gaussian_resource_map(width, height, n_samples=fish_patch_n_samples)
+        else:
+            raise ValueError(f"Unknown resource map: {resource_map}")
+
+        if agent_model == "greedy_bayesian":
+            self.social_field = SocialField(width, height)
+            self.belief_bank = BeliefBank(n_agents, width, height)
+            self.belief_bank.update_prior_beliefs()
+
+    @property
+    def states(self) -> list[str]:
+        return [STATES[s] for s in self.state]
+
+    def catch_rates(self, agents: np.ndarray) -> np.ndarray:
+        """
+        Catch rates of the given agents in their current fishing bout
+        """
+        trials = np.minimum(self.bout_trials[agents], self.catch_window)
+        return np.divide(self.window_catches[agents], trials, out=np.zeros(len(agents)), where=trials > 0)
+
+    def get_neighborhood_destinations(self, agents: np.ndarray, radius: int) -> np.ndarray:
+        """
+        Uniformly random cells in the Moore neighbourhood of the agents, excluding their current cells
+        """
+        pos = self.pos[agents]
+        low = np.maximum(pos - radius, 0)
+        high = np.minimum(pos + radius, [self.width - 1, self.height - 1])
+        destination = self.rng.integers(low, high + 1)
+
+        # redraw the destinations that fell on the current cell
+        redraw = np.flatnonzero((destination == pos).all(axis=1))
+        while len(redraw) > 0:
+            destination[redraw] = self.rng.integers(low[redraw], high[redraw] + 1)
+            redraw = redraw[(destination[redraw] == pos[redraw]).all(axis=1)]
+        return destination
+
+    def get_far_destinations(self, agents: np.ndarray, radius: int = 5) -> np.ndarray:
+        destination = self.get_neighborhood_destinations(agents, radius)
+        if self.agent_model != "imitator":
+            return destination
+
+        # imitators go to the most successful fishing agent in the neighbourhood
+        candidates = np.flatnonzero((self.state == FISHING) & (self.bout_catches > 0))
+        if len(candidates) == 0 or len(agents) == 0:
+            return destination
+
+        distance = np.abs(self.pos[agents, None, :] - self.pos[None, candidates, :]).max(axis=2)
+        in_reach = (distance <= radius) & (distance > 0)
+        # random tie-breaking between equally successful agents
+        score = np.where(in_reach, self.bout_catches[candidates] + self.rng.random(in_reach.shape), -1)
+        best = score.argmax(axis=1)
+        has_best = in_reach.any(axis=1)
+        destination[has_best] = self.pos[candidates[best[has_best]]]
+        return destination
+
+    def update_beliefs(self, agents: np.ndarray) -> None:
+        """
+        Batched version of BaseIceFisher.update_belief
+        """
+        fishing = np.flatnonzero(self.state == FISHING)
+        rates = self.catch_rates(fishing)
+        self.social_field.rebuild(self.pos[fishing])
+
+        for start in range(0, len(agents), self.belief_chunk_size):
+            chunk = agents[start:start + self.belief_chunk_size]
+            social_likelihoods = np.empty((len(chunk), self.width, self.height))
+            catch_likelihoods = np.full((len(chunk), self.width, self.height), 1e-5)
+            for i, agent in enumerate(chunk):
+                x, y = self.pos[agent]
+                # social information of all fishing agents except the ones in the current cell
+                self.social_field.likelihood(exclude=(x, y), out=social_likelihoods[i])
+
+                # catch rates of the close fishing agents, including the agent itself, and of the agent itself
+                close = np.abs(self.pos[fishing] - (x, y)).max(axis=1) <= 10
+                for (cx, cy), rate in zip(self.pos[fishing[close]], rates[close]):
+                    stamp_disk(catch_likelihoods[i], cx, cy, radius=3, weight=rate)
+                stamp_disk(catch_likelihoods[i], x, y, radius=3, weight=self.catch_rates([agent])[0])
+            self.belief_bank.update_beliefs(chunk, social_likelihoods, catch_likelihoods)
+
+    def get_greedy_destinations(self, agents: np.ndarray) -> np.ndarray:
+        """
+        Batched version of GreedyBayesFisher.choose_action: the most promising cells of the agents
+        """
+        destination = self.belief_bank.greedy_cells(agents, self.rng)
+
+        # with the small probability select random cell
+        explore = self.rng.random(len(agents)) < 0.05
+        destination[explore] = self.get_neighborhood_destinations(agents[explore], radius=5)
+        return destination
+
+    def select_next_actions(self):
+        """
+        Batched version of BaseIceFisher.select_next_action
+        """
+        initial = self.state == INITIAL
+        arrived = (self.state == MOVING) & (self.pos == self.destination).all(axis=1)
+        fishing_done = (self.state == FISHING) & (self.fishing_time == self.max_fishing_time)
+
+        if self.agent_model == "greedy_bayesian":
+            deciding = np.flatnonzero(fishing_done)
+            self.update_beliefs(deciding)
+            greedy_destination = self.get_greedy_destinations(deciding)
+            stay = (greedy_destination == self.pos[deciding]).all(axis=1)
+            to_greedy = deciding[~stay]
+            to_far = initial
+            to_close = np.zeros(self.n_agents, dtype=bool)
+            to_fishing = arrived.copy()
+            to_fishing[deciding[stay]] = True
+        else:
+            rate = self.catch_rates(np.arange(self.n_agents))
+            to_greedy = np.zeros(0, dtype=int)
+            to_far = initial | (fishing_done & (rate < 1 / 3))
+            to_close = fishing_done & (rate >= 1 / 3) & (rate < 2 / 3)
+            to_fishing = arrived | (fishing_done & (rate >= 2 / 3))
+
+        far = np.flatnonzero(to_far)
+        close = np.flatnonzero(to_close)
+        far_destination = self.get_far_destinations(far)
+        close_destination = self.get_neighborhood_destinations(close, radius=1)
+
+        self.state[far] = MOVING
+        self.destination[far] = far_destination
+        self.state[close] = MOVING
+        self.destination[close] = close_destination
+        self.state[to_fishing] = FISHING
+        if len(to_greedy) > 0:
+            self.state[to_greedy] = MOVING
+            self.destination[to_greedy] = greedy_destination[~stay]
+
+        # clean up the previous state
+        done = to_far | to_close | to_fishing
+        done[to_greedy] = True
+        self.fishing_time[done] = 0
+        self.window_catches[done] = 0
+        self.bout_trials[done] = 0
+        self.catch_windows[done] = 0
+        self.bout_catches[done] = 0
+
+    def move(self):
+        """
+        Move all moving agents one cell closer to their destinations
+        """
+        moving = self.state == MOVING
+        self.pos[moving] += np.sign(self.destination[moving] - self.pos[moving])
+
+    def fish(self):
+        """
+        All fishing agents fish in their current cells
+        """
+        fishing = np.flatnonzero(self.state == FISHING)
+        # first time no fishing, only drilling
+        trying = fishing[self.fishing_time[fishing] > 0]
+
+        x, y = self.pos[trying].T
+        n_fish = self.resource_map[x, y]
+        p_catch = np.minimum(n_fish / self.fish_catch_threshold, 0.8)
+        caught = trying[self.rng.random(len(trying)) < p_catch]
+
+        # agents fishing in the same cell can not catch more fish than available, the first ones in random order win
+        caught = self.rng.permutation(caught)
+        cell = np.ravel_multi_index(tuple(self.pos[caught].T), self.resource_map.shape)
+        order = np.argsort(cell, kind="stable")
+        caught, cell = caught[order], cell[order]
+        rank = np.arange(len(cell)) - np.searchsorted(cell, cell)
+        available = rank < self.resource_map.ravel()[cell]
+        caught = caught[available]
+
+        # the outcome replaces the oldest one in the window
+        outcome = np.zeros(len(self.pos), dtype=np.int8)
+        outcome[caught] = 1
+        slot = self.bout_trials[trying] % self.catch_window
+        self.window_catches[trying] += outcome[trying] - self.catch_windows[trying, slot]
+        self.catch_windows[trying, slot] = outcome[trying]
+        self.bout_trials[trying] += 1
+        self.total_catch[caught] += 1
+        self.bout_catches[caught] += 1
+
+        # depletion of the resource
+        np.subtract.at(self.resource_map, tuple(self.pos[caught].T), 1)
+
+        # increase fishing time
+        self.fishing_time[fishing] += 1
+
+    def step(self):
+        self.select_next_actions()
+        self.move()
+        self.fish()
+        self.schedule.step()
+
+        # collect data
+        self.datacollector.collect(self)
+
+    def run_model(self, step_count: int = 100) -> None:
+        for _ in range(step_count):
+            self.step()
@@ -0,0 +1,125 @@
+import base64
+import os
+from typing import Callable
+
+import matplotlib as mpl
+import numpy as np
+from mesa.visualization.ModularVisualization import VisualizationElement
+
+
+def quantize(values: np.ndarray, vmin: float, vmax: float) -> np.ndarray:
+    """
+    Map the values linearly from [vmin, vmax] to the colour indices [0, 255]
+    """
+    if vmax <= vmin:
+        # an empty range, the values above it get the last colour
+        return np.where(np.asarray(values) > vmin, 255, 0).astype(np.uint8)
+    scaled = (np.asarray(values, dtype=float) - vmin) * (255 / (vmax - vmin))
+    return np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+
+
+def _b64(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+def encode_frame(frame: np.ndarray, previous: np.ndarray = None) -> dict:
+    """
+    Encode a quantised frame as a key frame or, if it is cheaper, as the changes to the previous frame
+
+    :param frame: uint8 array of shape (width, height)
+    :param previous: the last frame sent to the client
+    :return: JSON-ready message
+    """
+    if previous is not None and previous.shape == frame.shape:
+        changed = np.flatnonzero(frame.ravel() != previous.ravel()).astype(np.uint32)
+        # a changed cell costs 5 bytes, a key frame 1 byte per cell
+        if 5 * len(changed) < frame.size:
+            return {"type": "delta", "indices": _b64(changed), "values": _b64(frame.ravel()[changed])}
+    return {"type": "key", "width": frame.shape[0], "height": frame.shape[1], "values": _b64(frame)}
+
+
+def decode_frame(message: dict, previous: np.ndarray = None) -> np.ndarray:
+    """
+    Inverse of encode_frame, used by the tests and offline analysis
+    """
+    values = np.frombuffer(base64.b64decode(message["values"]), dtype=np.uint8)
+    if message["type"] == "key":
+        return values.reshape(message["width"], message["height"]).copy()
+    frame = previous.copy()
+    frame.ravel()[np.frombuffer(base64.b64decode(message["indices"]), dtype=np.uint32)] = values
+    return frame
+
+
+class RasterGrid(VisualizationElement):
+    local_includes = ["RasterModule.js"]
+    local_dir = os.path.dirname(__file__)
+
+    def __init__(self,
+                 source: Callable,
+                 vmin: float = 0,
+                 vmax: float = 1,
+                 canvas_width: int = 500,
+                 canvas_height: int = 500,
+                 cmap: str = "Blues",
+                 markers: Callable = None,
+                 key_frame_interval: int = 50):
+        """
+        Heatmap of a model array, sent to the client as one quantised and delta-encoded frame per step
+
+        :param source: function returning the (width, height) array to show for a model
+        :param vmin: value shown with the first colour of the colormap
+        :param vmax: value shown with the last colour of the colormap
+        :param cmap: matplotlib colormap
+        :param markers: function returning a list of (x, y, colour) markers drawn on top of the heatmap
+        :param key_frame_interval: send a key frame every so many steps, e.g. for newly connected clients
+        """
+        super().__init__()
+        self.source = source
+        self.vmin = vmin
+        self.vmax = vmax
+        self.markers = markers
+        self.key_frame_interval = key_frame_interval
+        palette = (mpl.colormaps[cmap](np.linspace(0, 1, 256))[:, :3] * 255).astype(np.uint8)
+        self.js_code = f"elements.push(new RasterModule({canvas_width}, {canvas_height}, '{_b64(palette)}'));"
+
+        self._model = None
+        self._steps = None
+        self._key_steps = None  # steps of the last key frame
+        self._frame = None
+
+    def render(self, model) -> dict:
+        frame = quantize(self.source(model), self.vmin, self.vmax)
+
+        # the client only keeps the frames of the current model
+        new_model = model is not self._model or model.schedule.steps < self._steps
+        # steps may be skipped, e.g. by the decoupled server
+        key_frame = new_model or model.schedule.steps - self._key_steps >= self.key_frame_interval
+        message = encode_frame(frame, None if key_frame else self._frame)
+        self._model, self._steps, self._frame = model, model.schedule.steps, frame
+        if key_frame:
+            self._key_steps = model.schedule.steps
+
+        if self.markers is not None:
+            message["markers"] = [[int(x), int(y), color] for x, y, color in self.markers(model)]
+        return message
+
+
+def resource_map(model) -> np.ndarray:
+    return model.resource_map
+
+
+def belief_of_agent(attribute: str = "belief", unique_id: int = 1) -> Callable:
+    """
+    Source of the belief arrays of one agent, zeros if the agent has no belief
+    """
+    def source(model) -> np.ndarray:
+        agent = next((a for a in model.schedule.agents if a.unique_id == unique_id), None)
+        if agent is None or getattr(agent, "belief", None) is None:
+            return np.zeros((model.grid.width, model.grid.height))
+        return getattr(agent.belief, attribute)
+    return source
+
+
+def fisher_markers(model) -> list[tuple[int, int, str]]:
+    colors = {"fishing": "#d62728", "moving": "#ff7f0e", "initial": "#7f7f7f"}
+    return [(*agent.pos, colors[agent.state]) for agent in model.schedule.agents if hasattr(agent, "state")]
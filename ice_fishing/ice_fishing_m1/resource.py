@@ -0,0 +1,113 @@
+import hashlib
+
+import numpy as np
+
+
+class ResourceDynamics:
+    def __init__(self,
+                 growth_rate: float = 0.0,
+                 carrying_capacity=None,
+                 diffusion: float = 0.0,
+                 drift: tuple[float, float] = (0.0, 0.0),
+                 conserve: bool = True) -> None:
+        """
+        Regrowth and movement of the fish, applied to the whole resource map once per step. The fish counts stay
+        integers: the regrowth is rounded stochastically and every fish moves independently.
+
+        The logistic regrowth of a cell with N fish is growth_rate * N * (1 - N / K) for its carrying capacity K.
+        A fish moves to each of the four neighbouring cells with the probability diffusion, and further along the
+        drift, e.g. drift=(0.1, 0) moves it to the cell with the larger x with the additional probability 0.1. The
+        expected map after the movement is the convolution of the map with the corresponding 3 x 3 stencil.
+
+        :param growth_rate: logistic growth rate per step, no regrowth if 0
+        :param carrying_capacity: number or map of the maximum numbers of fish, the initial resource map if None
+        :param diffusion: probability to move to each neighbouring cell in a step
+        :param drift: additional probabilities to move along the x and the y axis, negative for the smaller x or y
+        :param conserve: fish moving out of the lake stay in their cell, otherwise they leave the lake
+        """
+        self.growth_rate = growth_rate
+        self.carrying_capacity = carrying_capacity
+        self.diffusion = diffusion
+        self.drift = tuple(drift)
+        self.conserve = conserve
+
+        # probabilities of the moves to the larger x, the smaller x, the larger y and the smaller y
+        self.move_probabilities = (diffusion + max(self.drift[0], 0), diffusion + max(-self.drift[0], 0),
+                                   diffusion + max(self.drift[1], 0), diffusion + max(-self.drift[1], 0))
+        if min(self.move_probabilities) < 0 or sum(self.move_probabilities) > 1:
+            raise ValueError("The move probabilities of a fish must be non-negative and sum up to at most 1")
+
+    def __repr__(self) -> str:
+        capacity = self.carrying_capacity
+        if isinstance(capacity, np.ndarray):
+            # the content of the map, the repr identifies the dynamics, e.g. in the result cache
+            capacity = np.ascontiguousarray(capacity)
+            digest = hashlib.sha1(repr((capacity.shape, capacity.dtype.str)).encode() + capacity.tobytes())
+            capacity = f"map:{digest.hexdigest()}"
+        return f"ResourceDynamics(growth_rate={self.growth_rate}, carrying_capacity={capacity}, " \
+               f"diffusion={self.diffusion}, drift={self.drift}, conserve={self.conserve})"
+
+    def regrow(self, counts: np.ndarray, carrying_capacity: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Logistic regrowth of the integer fish counts, cells without capacity do not grow
+        """
+        has_capacity = carrying_capacity > 0
+        growth = np.zeros(counts.shape)
+        np.divide(counts, carrying_capacity, out=growth, where=has_capacity)
+        growth = np.where(has_capacity, self.growth_rate * counts * (1 - growth), 0.0)
+        # unbiased rounding to integers
+        growth = np.floor(growth + rng.random(counts.shape)).astype(counts.dtype)
+        return np.maximum(counts + growth, 0)
+
+    def move(self, counts: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Move the fish of the integer fish counts to the neighbouring cells
+        """
+        # the fish leaving a cell, only drawn for the cells with fish
+        occupied = np.flatnonzero(counts)
+        p_move = sum(self.move_probabilities)
+        movers = rng.binomial(counts.ravel()[occupied], p_move)
+        moved = counts.ravel().copy()
+        moved[occupied] -= movers
+        moved = moved.reshape(counts.shape)
+
+        # the directions of the moving fish, a multinomial draw as conditional binomials
+        occupied, remaining = occupied[movers > 0], movers[movers > 0]
+        p_remaining = p_move
+        outflows = []
+        for p in self.move_probabilities:
+            if p > 0:
+                draws = rng.binomial(remaining, min(p / p_remaining, 1.0))
+                remaining = remaining - draws
+                p_remaining -= p
+                outflow = np.zeros(counts.size, dtype=counts.dtype)
+                outflow[occupied] = draws
+                outflows.append(outflow.reshape(counts.shape))
+            else:
+                outflows.append(None)
+
+        for outflow, axis, shift in zip(outflows, (0, 0, 1, 1), (1, -1, 1, -1)):
+            if outflow is None:
+                continue
+            # the cells the fish move to, the fish of the last row along the axis move out of the lake
+            source = [slice(None)] * 2
+            target = [slice(None)] * 2
+            source[axis] = slice(None, -1) if shift > 0 else slice(1, None)
+            target[axis] = slice(1, None) if shift > 0 else slice(None, -1)
+            moved[tuple(target)] += outflow[tuple(source)]
+            if self.conserve:
+                edge = [slice(None)] * 2
+                edge[axis] = -1 if shift > 0 else 0
+                moved[tuple(edge)] += outflow[tuple(edge)]
+        return moved
+
+    def step(self, resource_map: np.ndarray, carrying_capacity: np.ndarray, rng: np.random.Generator) -> None:
+        """
+        Update the resource map in place: the regrowth, then the movement of the fish
+        """
+        counts = resource_map.astype(np.int64)
+        if self.growth_rate != 0:
+            counts = self.regrow(counts, carrying_capacity, rng)
+        if any(p > 0 for p in self.move_probabilities):
+            counts = self.move(counts, rng)
+        resource_map[...] = counts
@@ -1,90 +1,36 @@
 import mesa
-import matplotlib as mpl
 
-from .agent_fish import Fish, BeliefHolderAgent
-from .agent_fisher import BaseIceFisher
+from .decoupled_server import DecoupledServer
 from .model import IceFishingModel
+from .raster import RasterGrid, resource_map, belief_of_agent, fisher_markers
 
-cmap = mpl.colormaps['Blues']
-norm = mpl.colors.Normalize(vmin=0, vmax=20)
-m = mpl.cm.ScalarMappable(cmap=cmap, norm=norm)
-
-m_belief = mpl.cm.ScalarMappable(cmap=mpl.colormaps['Blues'], norm=mpl.colors.Normalize(vmin=0, vmax=.05))
-
-
-def draw_grid(agent):
-    """
-    Portrayal Method for canvas
-    """
-    if agent is None:
-        return
-
-    if isinstance(agent, Fish):
-        color = mpl.colors.to_hex(m.to_rgba(agent.p_catch))
-
-        portrayal = {"Color": color, "Shape": "rect", "Filled": "true", "Layer": 0, "w": 0.9, "h": 0.9}
-        return portrayal
-
-    if isinstance(agent, BeliefHolderAgent):
-        return
-
-    if agent.state == "fishing" and agent.fishing_time == 1:
-        portrayal = {"Shape": "jackhammer.svg", "Layer": 1, "State": agent.state, "Catch": agent.total_catch}
-    elif agent.state == "fishing":
-        portrayal = {"Shape": "fisher-fishing.svg", "Layer": 1, "State": agent.state, "Catch": agent.total_catch}
-    elif agent.state == "moving":
-        portrayal = {"Shape": "fisher-moving.svg", "Layer": 1, "State": agent.state, "Catch": agent.total_catch}
-    else:
-        portrayal = {"Shape": "fisher-fishing.svg", "Layer": 1, "State": agent.state, "Catch": agent.total_catch}
-    return portrayal
-
-
-def draw_belief(agent, value: float):
-    # draw circle for the agent with the id 1
-    if isinstance(agent, BaseIceFisher) and agent.unique_id == 1:
-        return {"Shape": "circle", "r": 0.5, "Filled": "true", "Color": "red", "Layer": 1}
-
-    if not isinstance(agent, BeliefHolderAgent):
-        return
-
-    color = mpl.colors.to_hex(m_belief.to_rgba(value))
-    portrayal = {"Color": color, "Shape": "rect", "Filled": "true", "Layer": 0, "w": 0.9, "h": 0.9}
-    return portrayal
-
-
-def draw_social_belief(agent):
-    return draw_belief(agent, agent.social_likelihood if hasattr(agent, "social_likelihood") else 0)
-
-
-def draw_catch_rate(agent):
-    return draw_belief(agent, agent.catch_likelihood if hasattr(agent, "catch_likelihood") else 0)
-
-
-def draw_softmax_belief(agent):
-    return draw_belief(agent, agent.belief if hasattr(agent, "belief") else 0)
-
-
-grid_size = 20
+grid_size = 100
 grid_canvas_size = 600
 
-grid = mesa.visualization.CanvasGrid(
-    draw_grid, grid_size, grid_size, grid_canvas_size, grid_canvas_size)
+# the arrays are rendered as heatmaps, so the model does not need per cell agents for the visualization
+grid = RasterGrid(resource_map, vmin=0, vmax=20, canvas_width=grid_canvas_size, canvas_height=grid_canvas_size,
+                  markers=fisher_markers)
 
 # chart = mesa.visualization.ChartModule([{"Label": "Total catch", "Color": "Black"}],
 #                                        canvas_height=100, canvas_width=1000,
 #                                        data_collector_name='datacollector')
 
-grid_belief_social = mesa.visualization.CanvasGrid(
-    draw_social_belief, grid_size, grid_size, grid_canvas_size, grid_canvas_size)
-grid_belief_catch = mesa.visualization.CanvasGrid(
-    draw_catch_rate, grid_size, grid_size, grid_canvas_size, grid_canvas_size)
-grid_belief_softmax = mesa.visualization.CanvasGrid(
-    draw_softmax_belief, grid_size, grid_size, grid_canvas_size, grid_canvas_size)
+
+def agent_1_marker(model):
+    return [(*agent.pos, "red") for agent in model.schedule.agents if agent.unique_id == 1]
+
+
+grid_belief_social = RasterGrid(belief_of_agent("social_likelihood"), vmin=0, vmax=.05,
+                                canvas_width=grid_canvas_size, canvas_height=grid_canvas_size, markers=agent_1_marker)
+grid_belief_catch = RasterGrid(belief_of_agent("catch_likelihood"), vmin=0, vmax=.05,
+                               canvas_width=grid_canvas_size, canvas_height=grid_canvas_size, markers=agent_1_marker)
+grid_belief_softmax = RasterGrid(belief_of_agent("belief"), vmin=0, vmax=.05,
+                                 canvas_width=grid_canvas_size, canvas_height=grid_canvas_size, markers=agent_1_marker)
 
 model_params = {
     "height": grid_size,
     "width": grid_size,
-    "server": True,
+    "record_beliefs": True,
     "agent_model": mesa.visualization.Choice("Agent model", value="greedy_bayesian",
                                              choices=["random", "imitator", "greedy_bayesian"]),
     "n_agents": mesa.visualization.Slider("N agents", value=5, min_value=1, max_value=10, step=1),
@@ -95,7 +41,17 @@ model_params = {
 plots = [grid, grid_belief_catch, grid_belief_social, grid_belief_softmax]
 # plots = [grid]
 
-server = mesa.visualization.ModularServer(
-    IceFishingModel, plots,
-    "Ice Fishing", model_params
-)
+
+def make_server(decoupled: bool = False, max_fps: float = 10) -> mesa.visualization.ModularServer:
+    """
+    The visual server, decoupled runs the model in the background and pushes at most max_fps frames per second
+    """
+    if decoupled:
+        return DecoupledServer(IceFishingModel, plots, "Ice Fishing", model_params, max_fps=max_fps)
+    return mesa.visualization.ModularServer(
+        IceFishingModel, plots,
+        "Ice Fishing", model_params
+    )
+
+
+server = make_server()
@@ -0,0 +1,126 @@
+import io
+import os
+import pickle
+import struct
+
+import mesa
+import numpy as np
+
+MAGIC = b"ICESNAP1"
+_HEADER = struct.Struct("<q")  # offset of the pickled state
+_ALIGNMENT = 64
+
+
+class _SnapshotPickler(pickle.Pickler):
+    def __init__(self, state: io.BytesIO, data) -> None:
+        """
+        Pickler writing the data of the numpy arrays to the data file instead of the pickle. Views are stored as
+        views of their base array, so arrays sharing memory, e.g. the beliefs and the rows of the belief bank, still
+        share it when they are restored.
+        """
+        super().__init__(state, protocol=pickle.HIGHEST_PROTOCOL)
+        self._data = data
+        self._offsets = {}  # id of a base array -> offset of its data in the data file
+        self._bases = []  # keeps the bases alive, their ids stay unique
+
+    def _write_base(self, base: np.ndarray) -> int:
+        if id(base) not in self._offsets:
+            padding = -self._data.tell() % _ALIGNMENT
+            self._data.write(bytes(padding))
+            self._offsets[id(base)] = self._data.tell()
+            self._data.write(base.tobytes(order="F" if base.flags.f_contiguous else "C"))
+            self._bases.append(base)
+        return self._offsets[id(base)]
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray) or obj.dtype.hasobject or obj.size == 0:
+            return None
+        base = obj
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if not (base.flags.c_contiguous or base.flags.f_contiguous):
+            return None
+        offset = self._write_base(base)
+        # position of the first element of the view in its base
+        offset += obj.__array_interface__["data"][0] - base.__array_interface__["data"][0]
+        return "ndarray", offset, obj.shape, obj.dtype.str, obj.strides
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, state: io.BytesIO, data: np.ndarray) -> None:
+        super().__init__(state)
+        self._data = data
+
+    def persistent_load(self, pid):
+        kind, offset, shape, dtype, strides = pid
+        if kind != "ndarray":
+            raise pickle.UnpicklingError(f"Unknown persistent id: {kind}")
+        return np.ndarray(shape, dtype=dtype, buffer=self._data, offset=offset, strides=strides)
+
+
+def save_snapshot(model: mesa.Model, path: str) -> str:
+    """
+    Save the complete state of a model, e.g. after a burn-in, to a single file: the model without its arrays is
+    pickled, the data of the arrays, e.g. the resource map, the beliefs, the catch histories and the fishing index,
+    is stored raw so that load_snapshot can memory-map it. The states of the random number generators and of the
+    scheduler, and the collected data are part of the snapshot.
+
+    :param model: the model, not instrumented
+    :param path: snapshot file, written atomically
+    :return: the path
+    """
+    if getattr(model, "stats", None) is not None:
+        raise ValueError("Instrumented models cannot be saved")
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(0))
+        state = io.BytesIO()
+        _SnapshotPickler(state, f).dump(model)
+        offset = f.tell()
+        f.write(state.getvalue())
+        f.seek(len(MAGIC))
+        f.write(_HEADER.pack(offset))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path: str, mmap: bool = True) -> mesa.Model:
+    """
+    Restore a model saved with save_snapshot, it continues exactly as the saved model would
+
+    :param mmap: memory-map the arrays copy-on-write instead of reading them. The pages of the file are shared by
+        all models restored from it, also across processes, until a model writes to them.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model snapshot")
+        offset, = _HEADER.unpack(f.read(_HEADER.size))
+        f.seek(offset)
+        state = f.read()
+    if mmap:
+        data = np.memmap(path, dtype=np.uint8, mode="c", shape=(offset,))
+    else:
+        data = np.fromfile(path, dtype=np.uint8, count=offset)
+    return _SnapshotUnpickler(io.BytesIO(state), data).load()
+
+
+def fork(path: str, seed: int = None, **attributes) -> mesa.Model:
+    """
+    A variant of the model of a snapshot: the model is restored, reseeded and its attributes are changed. Use
+    load_snapshot to continue the model with the random state of the snapshot.
+
+    :param path: snapshot file
+    :param seed: new seed of the random number generators, a fresh seed if None
+    :param attributes: new values of the attributes of the model that can change during a run, the runtime_attributes
+        of the model class, e.g. fish_catch_threshold
+    """
+    model = load_snapshot(path)
+    runtime_attributes = getattr(type(model), "runtime_attributes", ())
+    for name, value in attributes.items():
+        if name not in runtime_attributes:
+            raise ValueError(f"{name} cannot be changed in a fork, only {', '.join(runtime_attributes)}")
+        setattr(model, name, value)
+    model.reseed(seed)
+    return model
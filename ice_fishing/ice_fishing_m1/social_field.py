@@ -0,0 +1,113 @@
+from collections import Counter
+
+import numpy as np
+from scipy import ndimage
+
+from .utils.kernels import KernelBackend, get_backend
+from .utils.utils import disk_stencil
+
+
+class SocialField:
+    def __init__(self, width: int, height: int, radius: int = 5, weight: float = 0.1,
+                 kernels: KernelBackend = None) -> None:
+        """
+        Social information shared by all agents: the disks around all fishing agents
+
+        :param width: grid width
+        :param height: grid height
+        :param radius: radius of the disk around each fishing agent
+        :param weight: weight of a single fishing agent in the social likelihood
+        :param kernels: kernel backend for the disk stamping, numpy by default
+        """
+        self.kernels = get_backend() if kernels is None else kernels
+        self.radius = radius
+        self.weight = weight
+        self.counts = np.zeros((width, height), dtype=int)  # number of fishing agents per cell
+        self.tally = Counter()  # number of fishing agents per occupied cell, the nonzero counts
+        self.field = np.zeros((width, height))  # number of fishing agents disks covering each cell
+        self._block_sums = {}  # block size -> sums of the field over the blocks, see block_means
+
+    def rebuild(self, locs: tuple[tuple[int, int], ...]) -> None:
+        """
+        Recompute the field from scratch: scatter the fishing locations and convolve them with the disk
+        """
+        self.counts.fill(0)
+        self.tally = Counter((int(x), int(y)) for x, y in locs)
+        if len(locs) > 0:
+            xs, ys = np.asarray(locs, dtype=int).T
+            np.add.at(self.counts, (xs, ys), 1)
+        self.field = ndimage.convolve(self.counts.astype(float), disk_stencil(self.radius),
+                                      mode="constant", cval=0.0)
+        for block_size in self._block_sums:
+            self._block_sums[block_size] = self._sum_blocks(block_size)
+
+    def add(self, pos: tuple[int, int]) -> None:
+        """
+        Add a fishing agent at the given position
+        """
+        self.counts[pos] += 1
+        self.tally[pos] += 1
+        self.kernels.stamp_disk(self.field, *pos, radius=self.radius)
+        self._stamp_blocks(pos, 1)
+
+    def remove(self, pos: tuple[int, int]) -> None:
+        """
+        Remove a fishing agent from the given position
+        """
+        self.counts[pos] -= 1
+        self.tally[pos] -= 1
+        if self.tally[pos] == 0:
+            del self.tally[pos]
+        self.kernels.stamp_disk(self.field, *pos, radius=self.radius, weight=-1)
+        self._stamp_blocks(pos, -1)
+
+    def _sum_blocks(self, block_size: int) -> np.ndarray:
+        width, height = self.field.shape
+        padded = np.zeros((-(-width // block_size) * block_size, -(-height // block_size) * block_size))
+        padded[:width, :height] = self.field
+        n_x, n_y = padded.shape[0] // block_size, padded.shape[1] // block_size
+        return padded.reshape(n_x, block_size, n_y, block_size).sum(axis=(1, 3))
+
+    def _stamp_blocks(self, pos: tuple[int, int], weight: int) -> None:
+        if not self._block_sums:
+            return
+        # cells of the disk inside the grid
+        cells = np.argwhere(disk_stencil(self.radius)) + np.subtract(pos, self.radius)
+        cells = cells[np.all((cells >= 0) & (cells < self.field.shape), axis=1)]
+        for block_size, sums in self._block_sums.items():
+            np.add.at(sums, tuple((cells // block_size).T), weight)
+
+    def block_means(self, block_size: int) -> np.ndarray:
+        """
+        Mean of the field over blocks of block_size x block_size cells, smaller at the grid edges. The block sums are
+        maintained along with the field once they have been requested.
+        """
+        if block_size not in self._block_sums:
+            self._block_sums[block_size] = self._sum_blocks(block_size)
+        width, height = self.field.shape
+        sizes_x = np.minimum(block_size, width - np.arange(0, width, block_size))
+        sizes_y = np.minimum(block_size, height - np.arange(0, height, block_size))
+        return self._block_sums[block_size] / np.outer(sizes_x, sizes_y)
+
+    def locations(self, exclude: tuple[int, int] = None) -> tuple[tuple[int, int], ...]:
+        """
+        Cells of the fishing agents, a cell once per agent fishing in it
+
+        :param exclude: cell whose fishing agents are not included
+        """
+        return tuple(cell for cell, n in self.tally.items() if cell != exclude for _ in range(n))
+
+    def likelihood(self, exclude: tuple[int, int] = None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Social likelihood as seen from the excluded cell, i.e. without the agents fishing in that cell
+
+        :param exclude: cell whose fishing agents are not taken into account
+        :param out: array to write the likelihood into
+        :return: the social likelihood
+        """
+        out = np.multiply(self.field, self.weight, out=out)
+        if exclude is not None and self.counts[exclude] > 0:
+            self.kernels.stamp_disk(out, *exclude, radius=self.radius, weight=-self.counts[exclude] * self.weight)
+        # add a small number to avoid 0 probability
+        out += 1e-5
+        return out
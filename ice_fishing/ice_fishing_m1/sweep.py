@@ -0,0 +1,409 @@
+import glob
+import json
+import os
+from functools import partial
+from multiprocessing import Pool
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Type, Union
+
+import mesa
+import numpy as np
+import pandas as pd
+from mesa.batchrunner import _make_model_kwargs
+from tqdm.auto import tqdm
+
+from .model import IceFishingModel
+from .snapshot import fork
+from .utils.cache import file_digest, result_key
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+SHARD_FORMATS = ("npz", "parquet")
+
+
+def _shard_path(output_dir: str, run_id: int, shard_format: str) -> str:
+    return os.path.join(output_dir, f"run_{run_id:06d}.{shard_format}")
+
+
+def _column(values: list) -> np.ndarray:
+    if all(np.ndim(value) == 0 for value in values):
+        return np.array(values)
+    # e.g. tuples, one object per row
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _run_columns(model_cls: Type[mesa.Model], run: tuple[int, int, dict], max_steps: int,
+                 data_collection_period: int, snapshot: str = None) -> tuple[dict[str, np.ndarray], list[str]]:
+    """
+    Run a model as mesa.batch_run does and return the collected model data as columns. With a snapshot, the model is
+    forked from the snapshot with the parameters instead of being created. Unlike mesa.batch_run, a model that stops
+    early has rows up to max_steps with its final values.
+
+    :return: the columns and the names of the model variables among them
+    """
+    run_id, iteration, kwargs = run
+    model = model_cls(**kwargs) if snapshot is None else fork(snapshot, **kwargs)
+    while model.running and model.schedule.steps <= max_steps:
+        model.step()
+
+    # the final values of a stopped model are carried forward to the last step
+    n_steps = model.schedule.steps if model.running else max(model.schedule.steps, max_steps + 1)
+    steps = list(range(0, n_steps, data_collection_period))
+    if not steps or steps[-1] != n_steps - 1:
+        steps.append(n_steps - 1)
+
+    n_rows = len(steps)
+    columns = {
+        "RunId": np.full(n_rows, run_id),
+        "iteration": np.full(n_rows, iteration),
+        "Step": np.array(steps),
+    }
+    for param, value in kwargs.items():
+        columns[param] = _column([value] * n_rows)
+    for name, values in model.datacollector.model_vars.items():
+        columns[name] = _column([values[min(step, len(values) - 1)] for step in steps])
+    return columns, list(model.datacollector.model_vars)
+
+
+class FinalValue:
+    """
+    Keep only the last collected step of a run
+    """
+
+    def __call__(self, columns: dict[str, np.ndarray], variables: list[str]) -> dict[str, np.ndarray]:
+        return {name: column[-1:] for name, column in columns.items()}
+
+    def __repr__(self) -> str:
+        return "FinalValue()"
+
+
+class EveryK:
+    def __init__(self, k: int) -> None:
+        """
+        Keep the collected steps that are a multiple of k, and the last one
+
+        :param k: period in steps
+        """
+        self.k = k
+
+    def __call__(self, columns: dict[str, np.ndarray], variables: list[str]) -> dict[str, np.ndarray]:
+        keep = columns["Step"] % self.k == 0
+        keep[-1] = True
+        return {name: column[keep] for name, column in columns.items()}
+
+    def __repr__(self) -> str:
+        return f"EveryK({self.k})"
+
+
+class WindowStats:
+    def __init__(self, start: int = None, stop: int = None, stats: tuple[str, ...] = ("mean", "min", "max")) -> None:
+        """
+        Summary statistics of the model variables over the collected steps in [start, stop), one row per run
+
+        :param start: first step of the window, the first collected step if None
+        :param stop: end of the window, after the last collected step if None
+        :param stats: names of numpy reductions, e.g. "mean", "min", "max", "std"
+        """
+        self.start = start
+        self.stop = stop
+        self.stats = stats
+
+    def __call__(self, columns: dict[str, np.ndarray], variables: list[str]) -> dict[str, np.ndarray]:
+        step = columns["Step"]
+        window = np.ones(len(step), dtype=bool)
+        if self.start is not None:
+            window &= step >= self.start
+        if self.stop is not None:
+            window &= step < self.stop
+        if not window.any():
+            raise ValueError(f"No collected steps in the window [{self.start}, {self.stop})")
+
+        reduced = {name: column[:1] for name, column in columns.items() if name not in variables and name != "Step"}
+        for name in variables:
+            for stat in self.stats:
+                reduced[f"{name} {stat}"] = np.array([getattr(np, stat)(columns[name][window])])
+        return reduced
+
+    def __repr__(self) -> str:
+        return f"WindowStats({self.start}, {self.stop}, {self.stats})"
+
+
+class Welford:
+    """
+    Running mean and variance of equally shaped arrays, without keeping the arrays
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = None
+        self._m2 = None
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        if self.n == 0:
+            self.mean = np.zeros_like(values)
+            self._m2 = np.zeros_like(values)
+        self.n += 1
+        delta = values - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (values - self.mean)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """
+        Sample variance, as pandas' var
+        """
+        if self.n < 2:
+            return np.full_like(self.mean, np.nan)
+        return self._m2 / (self.n - 1)
+
+
+def _write_shard(columns: dict[str, np.ndarray], path: str, shard_format: str) -> None:
+    # the shard is renamed into place only when it is complete, its existence marks the run as done
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if shard_format == "parquet":
+        pd.DataFrame(columns).to_parquet(tmp_path)
+    else:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, __columns__=np.array(list(columns)), **columns)
+    os.replace(tmp_path, path)
+
+
+def _read_columns(path: str) -> dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=True) as shard:
+        return {str(name): shard[name] for name in shard["__columns__"]}
+
+
+def _read_shard(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.DataFrame(_read_columns(path))
+
+
+def _reduced_run(model_cls: Type[mesa.Model], run: tuple[int, int, dict], max_steps: int, data_collection_period: int,
+                 reducer: Callable = None, cache_dir: str = None, snapshot: str = None) -> dict[str, np.ndarray]:
+    """
+    Reduced data of a run, from the result cache if the run is seeded and was computed before
+    """
+    run_id, iteration, kwargs = run
+    path = None
+    if cache_dir is not None and kwargs.get("seed") is not None:
+        options = dict(max_steps=max_steps, data_collection_period=data_collection_period, reducer=repr(reducer))
+        if snapshot is not None:
+            options["snapshot"] = file_digest(snapshot)
+        key = result_key(f"{model_cls.__module__}.{model_cls.__qualname__}", kwargs, **options)
+        path = os.path.join(cache_dir, f"result_{key}.npz")
+        if os.path.exists(path):
+            columns = _read_columns(path)
+            # the same run can have a different position in another sweep
+            for name, value in (("RunId", run_id), ("iteration", iteration)):
+                if name in columns:
+                    columns[name] = np.full(len(columns[name]), value)
+            return columns
+
+    columns, variables = _run_columns(model_cls, run, max_steps, data_collection_period, snapshot)
+    if reducer is not None:
+        columns = reducer(columns, variables)
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_shard(columns, path, "npz")
+    return columns
+
+
+def _sweep_run(model_cls: Type[mesa.Model], run: tuple[int, int, dict], output_dir: str, shard_format: str,
+               max_steps: int, data_collection_period: int, reducer: Callable = None, cache_dir: str = None,
+               snapshot: str = None) -> int:
+    # the data is written by the worker, only the run id is sent back to the parent process
+    columns = _reduced_run(model_cls, run, max_steps, data_collection_period, reducer, cache_dir, snapshot)
+    _write_shard(columns, _shard_path(output_dir, run[0], shard_format), shard_format)
+    return run[0]
+
+
+def iteration_seed(seed: int, iteration: int) -> int:
+    """
+    Model seed of an iteration of a seeded sweep, the same for all conditions and independent of the sweep size
+    """
+    return int(np.random.SeedSequence([seed, iteration]).generate_state(1)[0])
+
+
+def _make_runs(parameters: Mapping[str, Union[Any, Iterable[Any]]], iterations: int,
+               seed: int = None) -> list[tuple[int, int, dict]]:
+    """
+    The runs of mesa.batch_run, the conditions of an iteration have consecutive run ids
+    """
+    runs = []
+    run_id = 0
+    for iteration in range(iterations):
+        for kwargs in _make_model_kwargs(parameters):
+            if seed is not None and "seed" not in kwargs:
+                kwargs["seed"] = iteration_seed(seed, iteration)
+            runs.append((run_id, iteration, kwargs))
+            run_id += 1
+    return runs
+
+
+def _map_runs(process_func: Callable, runs: list, number_processes: Optional[int], n_done: int = 0,
+              display_progress: bool = True) -> Iterator:
+    """
+    Results of the runs in the order they finish
+    """
+    with tqdm(total=n_done + len(runs), initial=n_done, disable=not display_progress) as pbar:
+        if number_processes == 1:
+            for run in runs:
+                yield process_func(run)
+                pbar.update()
+        else:
+            with Pool(number_processes) as p:
+                for result in p.imap_unordered(process_func, runs):
+                    yield result
+                    pbar.update()
+
+
+def _check_manifest(output_dir: str, manifest: dict) -> None:
+    """
+    Write the description of the sweep, or check that a resumed sweep is the same sweep
+    """
+    path = os.path.join(output_dir, "sweep.json")
+    manifest = json.loads(json.dumps(manifest, default=repr))
+    if os.path.exists(path):
+        with open(path) as f:
+            if json.load(f) != manifest:
+                raise ValueError(f"{output_dir} contains the results of a different sweep")
+    else:
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=1)
+
+
+def sweep(output_dir: str,
+          parameters: Mapping[str, Union[Any, Iterable[Any]]],
+          iterations: int = 1,
+          max_steps: int = 1000,
+          number_processes: Optional[int] = 1,
+          data_collection_period: int = -1,
+          display_progress: bool = True,
+          model_cls: Type[mesa.Model] = IceFishingModel,
+          shard_format: str = "npz",
+          reducer: Callable = None,
+          seed: int = None,
+          cache_dir: str = None,
+          snapshot: str = None) -> str:
+    """
+    Parameter sweep with the same runs as mesa.batch_run, where every finished run is written to its own shard in
+    the output directory instead of being kept in memory. Runs with a shard are done and are not run again, so an
+    interrupted sweep is resumed by calling sweep again with the same arguments. Load the results with load_sweep.
+    Runs that stop early, e.g. by the stopping criteria of IceFishingModel, have rows up to max_steps with their final
+    values carried forward.
+
+    :param output_dir: directory of the shards
+    :param shard_format: "npz", or "parquet" if pyarrow is installed
+    :param reducer: e.g. FinalValue(), EveryK(k) or WindowStats(), reduces the collected steps of a run in the worker
+    :param seed: seed of the sweep, the runs of an iteration get the model seed iteration_seed(seed, iteration)
+    :param cache_dir: directory of the result cache, where seeded runs are looked up before they are computed. The
+        parameters must have reprs that identify them, e.g. no functions such as a stop_condition.
+    :param snapshot: snapshot file, e.g. of a burn-in, every run forks its model from the snapshot with the parameters
+        as model attributes and the seed, see snapshot.fork. Only the runtime_attributes of the model can be
+        parameters, and the runs get fresh seeds without a seed. The runs continue up to max_steps steps in total and
+        their data includes the steps before the snapshot. The workers share the memory-mapped arrays of the snapshot.
+    :return: the output directory
+    """
+    if shard_format not in SHARD_FORMATS:
+        raise ValueError(f"Unknown shard format: {shard_format}")
+    if shard_format == "parquet" and pyarrow is None:
+        raise ImportError("The parquet shard format requires pyarrow")
+
+    runs = _make_runs(parameters, iterations, seed)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {
+        "model": f"{model_cls.__module__}.{model_cls.__qualname__}",
+        "runs": runs,
+        "max_steps": max_steps,
+        "data_collection_period": data_collection_period,
+        "reducer": reducer,
+    }
+    if snapshot is not None:
+        manifest["snapshot"] = file_digest(snapshot)
+    _check_manifest(output_dir, manifest)
+    # shards of runs interrupted by a crash
+    for tmp_path in glob.glob(os.path.join(output_dir, "run_*.tmp")):
+        os.remove(tmp_path)
+    todo = [run for run in runs if not os.path.exists(_shard_path(output_dir, run[0], shard_format))]
+
+    process_func = partial(_sweep_run, model_cls, output_dir=output_dir, shard_format=shard_format,
+                           max_steps=max_steps, data_collection_period=data_collection_period, reducer=reducer,
+                           cache_dir=cache_dir, snapshot=snapshot)
+    for _ in _map_runs(process_func, todo, number_processes, len(runs) - len(todo), display_progress):
+        pass
+
+    return output_dir
+
+
+def _labelled(process_func: Callable, run: tuple[int, int, dict]) -> tuple[tuple[int, int, dict], dict]:
+    return run, process_func(run)
+
+
+def condition_stats(parameters: Mapping[str, Union[Any, Iterable[Any]]],
+                    reducer: Callable = FinalValue(),
+                    iterations: int = 1,
+                    max_steps: int = 1000,
+                    number_processes: Optional[int] = 1,
+                    data_collection_period: int = 1,
+                    display_progress: bool = True,
+                    model_cls: Type[mesa.Model] = IceFishingModel,
+                    seed: int = None,
+                    cache_dir: str = None,
+                    snapshot: str = None) -> pd.DataFrame:
+    """
+    Mean and variance across the iterations of each condition of a parameter sweep. The runs are reduced in the
+    workers and folded into running statistics as they finish, so the memory does not grow with the iterations.
+
+    :param reducer: reduction of a run, the statistics are computed for each of its rows
+    :param seed: seed of the sweep, see sweep
+    :param cache_dir: directory of the result cache, see sweep
+    :param snapshot: snapshot file the runs are forked from, see sweep
+    :return: one row per condition and reduced row, with the columns "<variable> mean", "<variable> var" and "n"
+    """
+    runs = _make_runs(parameters, iterations, seed)
+    n_conditions = len(runs) // iterations if iterations > 0 else 0
+    stats = [None] * n_conditions
+    # the seeds of the iterations differ within a condition, they neither label nor are averaged
+    unlabelled = ["RunId", "iteration"] + (["seed"] if seed is not None and "seed" not in parameters else [])
+
+    process_func = partial(_reduced_run, model_cls, max_steps=max_steps,
+                           data_collection_period=data_collection_period, reducer=reducer, cache_dir=cache_dir,
+                           snapshot=snapshot)
+    labelled_func = partial(_labelled, process_func)
+    for run, reduced in _map_runs(labelled_func, runs, number_processes, display_progress=display_progress):
+        condition = run[0] % n_conditions
+        if stats[condition] is None:
+            # the parameters and the steps label the rows, the other columns are averaged
+            labels = {name: reduced[name] for name in [*run[2], "Step"] if name in reduced and name not in unlabelled}
+            values = [name for name in reduced if name not in labels and name not in unlabelled]
+            stats[condition] = labels, {name: Welford() for name in values}
+        for name, welford in stats[condition][1].items():
+            welford.update(reduced[name])
+
+    tables = []
+    for labels, welfords in filter(None, stats):
+        table = dict(labels)
+        for name, welford in welfords.items():
+            table["n"] = welford.n
+            table[f"{name} mean"] = welford.mean
+            table[f"{name} var"] = welford.variance
+        tables.append(pd.DataFrame(table))
+    return pd.concat(tables, ignore_index=True)
+
+
+def load_sweep(output_dir: str) -> pd.DataFrame:
+    """
+    Results of a sweep, the same as pd.DataFrame(mesa.batch_run(...)) sorted by run and step
+    """
+    paths = sorted(glob.glob(os.path.join(output_dir, "run_*.npz")) +
+                   glob.glob(os.path.join(output_dir, "run_*.parquet")))
+    results = pd.concat([_read_shard(path) for path in paths], ignore_index=True)
+    # runs reduced by WindowStats have no steps
+    order = [name for name in ("RunId", "Step") if name in results]
+    return results.sort_values(order, kind="stable", ignore_index=True)
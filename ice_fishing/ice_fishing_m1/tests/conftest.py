@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from scipy.stats import ks_2samp
+
+
+def _catch_ratios(engine, agent_model, n_runs=30, n_steps=150):
+    ratios = []
+    for seed in range(n_runs):
+        model = engine(width=20, height=20, n_agents=5, fish_patch_n_samples=2000, agent_model=agent_model, seed=seed)
+        model.run_model(n_steps)
+        ratios.append(model.datacollector.get_model_vars_dataframe()["Mean catch ratio"].to_numpy())
+    return np.array(ratios)
+
+
+@pytest.fixture
+def assert_same_catch_ratios():
+    """
+    Check that two engines, i.e. model classes or partials of them, give the same distribution of the final and the
+    intermediate catch ratios over seeded runs
+    """
+    def check(engine, other_engine, agent_model):
+        ratios = _catch_ratios(engine, agent_model)
+        other_ratios = _catch_ratios(other_engine, agent_model)
+
+        for step in (49, 99, 149):
+            assert ks_2samp(ratios[:, step], other_ratios[:, step]).pvalue > 0.001
+        assert np.isclose(ratios[:, -1].mean(), other_ratios[:, -1].mean(), rtol=0.2)
+    return check
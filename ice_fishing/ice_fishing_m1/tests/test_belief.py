@@ -1,6 +1,7 @@
 import numpy as np
 
 from ice_fishing.ice_fishing_m1.belief import Belief
+from ice_fishing.ice_fishing_m1.social_field import SocialField
 
 
 def test_init_belief():
@@ -48,3 +49,63 @@ def test_update_catch_likelihood():
     belief.update_catch_likelihood(((50, 50), (70, 70)), (0.4, 0.7), radius=1)
     assert np.allclose(belief.catch_likelihood[50, 50], 0.4, atol=1e-5)
     assert np.allclose(belief.catch_likelihood[70, 70], 0.7, atol=1e-5)
+
+
+def _update(belief, n_updates=20):
+    belief.update_prior_belief(((50, 50),), radius=5)
+    for i in range(n_updates):
+        belief.update_belief(((40 + i, 45), (60, 60)), ((50, 50), (55 + i % 3, 52)), (0.9, 0.3))
+
+
+def test_compact_belief_matches_default():
+    default = Belief(100, 100)
+    compact = Belief(100, 100, dtype=np.float32, log_domain=True, shared_buffers=True)
+    _update(default)
+    _update(compact)
+
+    assert compact.belief.dtype == np.float32
+    assert np.allclose(compact.belief, default.belief, rtol=1e-3, atol=1e-8)
+    assert np.allclose(compact.social_likelihood, default.social_likelihood)
+    assert np.allclose(compact.catch_likelihood, default.catch_likelihood)
+
+
+def test_shared_buffers_likelihoods_on_demand():
+    belief_1 = Belief(50, 50, shared_buffers=True)
+    belief_2 = Belief(50, 50, shared_buffers=True)
+    belief_1.update_catch_likelihood(((10, 10),), (0.5,), radius=1)
+    belief_2.update_catch_likelihood(((30, 30),), (0.7,), radius=1)
+
+    assert np.isclose(belief_1.catch_likelihood[10, 10], 0.5 + 1e-5)
+    assert np.isclose(belief_1.catch_likelihood[30, 30], 1e-5)
+    assert np.isclose(belief_2.catch_likelihood[30, 30], 0.7 + 1e-5)
+
+
+def test_log_domain_belief_does_not_underflow():
+    belief = Belief(100, 100, dtype=np.float32, log_domain=True)
+    reference = Belief(100, 100, log_domain=True)
+    plain = Belief(100, 100, dtype=np.float32)
+    for b in (belief, reference, plain):
+        _update(b, n_updates=500)
+
+    assert np.all(np.isfinite(belief.log_belief))
+    assert np.isclose(belief.belief.sum(), 1, atol=1e-4)
+    assert np.argmax(belief.log_belief) == np.argmax(reference.log_belief)
+    # the plain belief underflows to 0 in most of the cells, the log belief still ranks them
+    assert np.unique(belief.log_belief).size > np.unique(plain.belief).size
+
+
+def test_social_field_likelihood_is_kept():
+    field = SocialField(50, 50)
+    field.add((10, 10))
+    field.add((10, 10))
+    field.add((30, 30))
+    belief = Belief(50, 50, shared_buffers=True)
+    belief.use_social_field(field, exclude=(30, 30))
+    expected = field.likelihood(exclude=(30, 30))
+
+    # other agents move after the update and another belief overwrites the shared buffer
+    field.remove((10, 10))
+    field.add((40, 40))
+    Belief(50, 50, shared_buffers=True).use_social_field(field)
+
+    assert np.allclose(belief.social_likelihood, expected)
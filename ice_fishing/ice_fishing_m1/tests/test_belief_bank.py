@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ice_fishing.ice_fishing_m1.belief import Belief
+from ice_fishing.ice_fishing_m1.belief_bank import BeliefBank
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+
+
+@pytest.mark.parametrize("log_domain", [False, True])
+def test_batched_update_matches_single_beliefs(log_domain):
+    rng = np.random.default_rng(0)
+    bank = BeliefBank(4, 30, 20, log_domain=log_domain)
+    bank.update_prior_beliefs()
+
+    beliefs = [Belief(30, 20) for _ in range(4)]
+    for b in beliefs:
+        b.update_prior_belief()
+
+    social = rng.random((4, 30, 20)) + 1e-5
+    catch = rng.random((4, 30, 20)) + 1e-5
+    agents = np.array([0, 2, 3])
+    bank.update_beliefs(agents, social[agents], catch[agents])
+    for i in agents:
+        beliefs[i]._social_buffer[...] = social[i]
+        beliefs[i]._catch_buffer[...] = catch[i]
+        beliefs[i].apply_likelihoods()
+
+    for i, b in enumerate(beliefs):
+        assert np.allclose(bank.belief(i).belief, b.belief)
+
+
+def test_belief_views_share_the_bank():
+    bank = BeliefBank(2, 10, 10)
+    belief = bank.new_belief()
+    belief.update_prior_belief(((5, 5),), radius=1)
+
+    assert np.shares_memory(belief.belief, bank.beliefs)
+    assert np.allclose(bank.beliefs[0], belief.belief)
+    assert np.allclose(bank.beliefs[1], 0)
+
+    bank.new_belief()
+    with pytest.raises(ValueError):
+        bank.new_belief()
+
+
+def test_greedy_cells_break_ties_randomly():
+    bank = BeliefBank(2, 10, 10)
+    bank.beliefs[0, 2, 3] = bank.beliefs[0, 7, 1] = 1
+    bank.beliefs[1, 4, 4] = 1
+
+    rng = np.random.default_rng(0)
+    cells = np.array([bank.greedy_cells(np.array([0, 1]), rng) for _ in range(200)])
+    assert set(map(tuple, cells[:, 0])) == {(2, 3), (7, 1)}
+    assert 60 < np.sum((cells[:, 0] == (2, 3)).all(axis=1)) < 140
+    assert np.all(cells[:, 1] == (4, 4))
+
+
+def test_agent_beliefs_are_backed_by_the_bank():
+    model = IceFishingModel(width=20, height=20, n_agents=3, agent_model="greedy_bayesian")
+    model.run_model(30)
+
+    for i, agent in enumerate(model.schedule.agents):
+        assert np.shares_memory(agent.belief.belief, model.belief_bank.beliefs)
+        assert np.isclose(agent.belief.belief.sum(), 1)
@@ -0,0 +1,29 @@
+from ice_fishing.benchmarks.__main__ import main
+from ice_fishing.benchmarks.cases import benchmark_cases
+from ice_fishing.benchmarks.runner import run_benchmarks, compare
+
+
+def test_cases():
+    quick = benchmark_cases("quick")
+    full = benchmark_cases("full")
+    assert set(quick) < set(full)
+    assert "agents/greedy_bayesian/1000" in full
+    assert "grid/imitator/500" in full
+
+
+def test_run_and_compare(tmp_path):
+    results = run_benchmarks("quick", "micro/catch_rate*", repeat=2)
+    assert set(results["results"]) == {"micro/catch_rate_history", "micro/catch_rate_list"}
+    assert all(r["median"] > 0 and len(r["times"]) == 2 for r in results["results"].values())
+
+    slower = {**results, "results": {name: {**r, "median": 2 * r["median"]} for name, r in results["results"].items()}}
+    assert compare(results, results) == []
+    assert [r[0] for r in compare(results, slower, threshold=0.5)] == sorted(results["results"])
+
+
+def test_cli(tmp_path):
+    baseline, current = str(tmp_path / "baseline.json"), str(tmp_path / "current.json")
+    assert main(["run", "--filter", "server_setup/*", "--repeat", "2", "--output", baseline]) == 0
+    assert main(["run", "--filter", "server_setup/*", "--repeat", "2", "--output", current]) == 0
+    assert main(["compare", baseline, current, "--threshold", "100"]) == 0
+    assert main(["compare", baseline, current, "--threshold", "-1"]) == 1
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+import time
+
+import tornado.testing
+import tornado.websocket
+
+from ice_fishing.ice_fishing_m1.decoupled_server import DecoupledServer, SimulationWorker
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.raster import RasterGrid, resource_map
+
+
+def _wait_for(condition, timeout=10):
+    start = time.perf_counter()
+    while not condition():
+        assert time.perf_counter() - start < timeout
+        time.sleep(0.01)
+
+
+def _fail_at_step_3(model):
+    if model.schedule.steps == 3:
+        raise RuntimeError("the model failed")
+    return False
+
+
+class _Frames:
+    def __init__(self):
+        self.steps = []
+        self.thread_ids = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, step, frame):
+        with self.lock:
+            self.steps.append(step)
+            self.thread_ids.add(threading.get_ident())
+
+
+def test_worker_free_runs_and_drops_frames():
+    model = IceFishingModel(width=30, height=30, n_agents=5, seed=0)
+    frames = _Frames()
+    worker = SimulationWorker(model, lambda m: m.schedule.steps, frames, max_fps=5)
+    _wait_for(lambda: frames.steps == [0])
+
+    worker.play()
+    _wait_for(lambda: model.schedule.steps > 200)
+    worker.pause()
+    time.sleep(0.1)
+    steps = model.schedule.steps
+    time.sleep(0.1)
+    assert model.schedule.steps == steps
+    # the steps in between are not rendered
+    assert len(frames.steps) < steps / 2
+    assert frames.steps[-1] == steps
+    assert threading.get_ident() not in frames.thread_ids
+
+    # headless fast-forward, only the last step is rendered
+    n_frames = len(frames.steps)
+    worker.fast_forward(300)
+    _wait_for(lambda: frames.steps[-1] == steps + 300)
+    assert len(frames.steps) == n_frames + 1 and model.schedule.steps == steps + 300
+
+    worker.step()
+    _wait_for(lambda: frames.steps[-1] == steps + 301)
+    worker.stop()
+
+
+def test_worker_stops_with_the_model():
+    model = IceFishingModel(width=30, height=30, n_agents=5, seed=0, stop_condition=lambda m: m.schedule.steps == 50)
+    frames = _Frames()
+    worker = SimulationWorker(model, lambda m: m.schedule.steps, frames, playing=True)
+    _wait_for(lambda: frames.steps and frames.steps[-1] == 50)
+    worker.play()
+    time.sleep(0.05)
+    assert model.schedule.steps == 50
+    worker.stop()
+
+
+def test_worker_reports_errors():
+    model = IceFishingModel(width=30, height=30, n_agents=5, seed=0, stop_condition=_fail_at_step_3)
+    frames = _Frames()
+    errors = []
+    worker = SimulationWorker(model, lambda m: m.schedule.steps, frames, playing=True, on_error=errors.append)
+    _wait_for(lambda: errors)
+    assert worker.error is errors[0] and str(worker.error) == "the model failed"
+    # the worker stopped
+    worker.play()
+    time.sleep(0.05)
+    assert model.schedule.steps == 3
+    worker.stop()
+
+
+class DecoupledServerTest(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        elements = [RasterGrid(resource_map, vmin=0, vmax=20)]
+        return DecoupledServer(IceFishingModel, elements, "Ice Fishing", {"width": 30, "height": 30, "seed": 0})
+
+    def tearDown(self):
+        self._app.worker.stop()
+        super().tearDown()
+
+    async def _message(self, socket, message_type):
+        while True:
+            message = json.loads(await socket.read_message())
+            if message["type"] == message_type:
+                return message
+
+    @tornado.testing.gen_test(timeout=20)
+    async def test_protocol(self):
+        socket = await tornado.websocket.websocket_connect(f"ws://127.0.0.1:{self.get_http_port()}/ws")
+        assert (await self._message(socket, "model_params"))["type"] == "model_params"
+
+        # the first frame of the new model is a key frame
+        socket.write_message(json.dumps({"type": "reset"}))
+        raster, step = (await self._message(socket, "viz_state"))["data"]
+        assert raster["type"] == "key" and step == 0
+
+        socket.write_message(json.dumps({"type": "fast_forward", "steps": 500}))
+        _, step = (await self._message(socket, "viz_state"))["data"]
+        assert step == 500
+
+        socket.write_message(json.dumps({"type": "play"}))
+        steps = [(await self._message(socket, "viz_state"))["data"][1] for _ in range(3)]
+        assert steps == sorted(steps) and steps[0] > 500
+        socket.write_message(json.dumps({"type": "pause"}))
+        model = self._app.model
+        while self._app.worker.playing:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        paused_step = model.schedule.steps
+
+        # the step button steps the paused model once
+        socket.write_message(json.dumps({"type": "get_step"}))
+        while (await self._message(socket, "viz_state"))["data"][1] != paused_step + 1:
+            pass
+        await asyncio.sleep(0.1)
+        assert model.schedule.steps == paused_step + 1 and self._app.model is model
+        socket.close()
+
+    @tornado.testing.gen_test(timeout=20)
+    async def test_error_ends_the_simulation(self):
+        socket = await tornado.websocket.websocket_connect(f"ws://127.0.0.1:{self.get_http_port()}/ws")
+        await self._message(socket, "model_params")
+        self._app.model_kwargs = {**self._app.model_kwargs, "stop_condition": _fail_at_step_3}
+        socket.write_message(json.dumps({"type": "reset"}))
+        await self._message(socket, "viz_state")
+
+        socket.write_message(json.dumps({"type": "play"}))
+        assert (await self._message(socket, "end"))["error"] == "RuntimeError: the model failed"
+        socket.write_message(json.dumps({"type": "get_step"}))
+        assert (await self._message(socket, "end"))["error"] == "RuntimeError: the model failed"
+        socket.close()
+
+    def test_page_includes_the_controls(self):
+        page = self.fetch("/").body.decode()
+        assert "new SimulationControl()" in page and "/local/SimulationControl/SimulationControl.js" in page
+        assert b"fast_forward" in self.fetch("/local/SimulationControl/SimulationControl.js").body
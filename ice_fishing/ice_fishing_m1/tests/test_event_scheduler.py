@@ -0,0 +1,72 @@
+from functools import partial
+
+import pytest
+
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.utils.utils import catch_rate
+
+
+def test_unknown_scheduler():
+    with pytest.raises(ValueError):
+        IceFishingModel(scheduler="unknown")
+
+
+def test_advance_moves_like_move():
+    model = IceFishingModel(width=30, height=30, seed=0)
+    agent, other = model.fishers[:2]
+    for a in (agent, other):
+        a.state = "moving"
+        a.destination = (3, 27)
+
+    for n in range(1, 20):
+        other.move(other.destination)
+        agent.advance(n - 1, n)
+        assert agent.pos == other.pos
+    assert agent.pos == (3, 27)
+    assert agent.action_duration() == 1
+
+
+@pytest.mark.parametrize("agent_model", ["random", "imitator", "greedy_bayesian"])
+def test_event_scheduler_state(agent_model):
+    model = IceFishingModel(width=30, height=30, n_agents=10, fish_patch_n_samples=5000, agent_model=agent_model,
+                            scheduler="event", seed=1)
+    initial_fish = model.resource_map.sum()
+
+    for step in range(100):
+        model.step()
+        assert model.resource_map.min() >= 0
+        assert model.remaining_fish + model.total_catch == initial_fish
+        if step % 10 == 0:
+            # the totals count the catches before they are materialised
+            model.materialise()
+            assert model.resource_map.sum() + model.total_catch == initial_fish
+            assert model.total_catch == sum(a.total_catch for a in model.fishers)
+
+    model.materialise()
+    fishing = [a for a in model.fishers if a.state == "fishing"]
+    assert set(model.fishing_index.agents) == set(fishing)
+    for agent in fishing:
+        slot = model.fishing_index.slots[agent]
+        assert model.fishing_index.position(slot) == agent.pos
+        assert model.fishing_index.catch_rates[slot] == catch_rate(agent.last_catches)
+        assert 0 < agent.fishing_time <= agent.max_fishing_time
+    for agent in model.fishers:
+        assert model.grid.out_of_bounds(agent.pos) is False
+        assert agent in model.grid.get_cell_list_contents([agent.pos])
+
+
+def test_decisions_only_at_decision_times():
+    kwargs = dict(width=30, height=30, n_agents=10, max_fishing_time=50, seed=0, instrumentation=True)
+    per_step = IceFishingModel(**kwargs)
+    event = IceFishingModel(scheduler="event", **kwargs)
+    per_step.run_model(200)
+    event.run_model(200)
+
+    assert per_step.stats.calls["select_next_action"] == 2000
+    assert event.stats.calls["select_next_action"] < 200
+    assert event.stats.calls["agent_step"] == 0
+
+
+@pytest.mark.parametrize("agent_model", ["random", "imitator", "greedy_bayesian"])
+def test_catch_ratio_matches_random_activation(agent_model, assert_same_catch_ratios):
+    assert_same_catch_ratios(IceFishingModel, partial(IceFishingModel, scheduler="event"), agent_model)
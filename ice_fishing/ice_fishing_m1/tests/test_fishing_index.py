@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from ice_fishing.ice_fishing_m1.agent_fisher import BaseIceFisher
+from ice_fishing.ice_fishing_m1.fishing_index import FishingIndex
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.utils.utils import CatchHistory, catch_rate
+
+
+class _Fisher:
+    def __init__(self, pos, last_catches=()):
+        self.pos = pos
+        self.last_catches = CatchHistory()
+        for caught in last_catches:
+            self.last_catches.append(caught)
+
+
+def test_add_remove():
+    index = FishingIndex(capacity=2)
+    fishers = [_Fisher((i, i), [1] * i) for i in range(5)]
+    for f in fishers:
+        index.add(f)
+
+    assert len(index) == 5
+    assert list(index.n_catches[:5]) == [0, 1, 2, 3, 4]
+
+    index.remove(fishers[1])
+    assert len(index) == 4
+    assert fishers[1] not in index
+    for f in fishers[:1] + fishers[2:]:
+        assert index.position(index.slots[f]) == f.pos
+        assert index.n_catches[index.slots[f]] == f.last_catches.total
+
+
+@pytest.mark.parametrize("radius", [1, 3, 10])
+def test_within_matches_brute_force(radius):
+    rng = np.random.default_rng(0)
+    index = FishingIndex()
+    fishers = [_Fisher(tuple(int(v) for v in rng.integers(0, 30, 2))) for _ in range(50)]
+    for f in fishers:
+        index.add(f)
+
+    centers = rng.integers(0, 30, (20, 2))
+    for center in centers:
+        expected = sorted(index.slots[f] for f in fishers
+                          if max(abs(f.pos[0] - center[0]), abs(f.pos[1] - center[1])) <= radius)
+        assert list(index.within(tuple(center), radius)) == expected
+
+        without_center = [s for s in expected if index.position(s) != tuple(center)]
+        assert list(index.within(tuple(center), radius, include_center=False)) == without_center
+
+
+@pytest.mark.parametrize("agent_model", ["random", "imitator", "greedy_bayesian"])
+def test_model_index_matches_fishing_agents(agent_model):
+    model = IceFishingModel(width=20, height=20, n_agents=10, agent_model=agent_model)
+
+    for _ in range(30):
+        model.step()
+
+        fishing = [a for a in model.schedule.agents if isinstance(a, BaseIceFisher) and a.state == "fishing"]
+        assert set(model.fishing_index.agents) == set(fishing)
+        for agent in fishing:
+            slot = model.fishing_index.slots[agent]
+            assert model.fishing_index.position(slot) == agent.pos
+            assert model.fishing_index.catch_rates[slot] == catch_rate(agent.last_catches)
+
+
+def _brute_force_best(fishers, index, pos, radius, include_center):
+    best = 0
+    for f in fishers:
+        distance = max(abs(f.pos[0] - pos[0]), abs(f.pos[1] - pos[1]))
+        if distance <= radius and (include_center or distance > 0):
+            best = max(best, index.n_catches[index.slots[f]])
+    return best
+
+
+def test_best_within_matches_brute_force():
+    rng = np.random.default_rng(1)
+    index = FishingIndex(shape=(15, 15))
+    fishers = []
+    for _ in range(300):
+        action = rng.integers(3)
+        if action == 0 or not fishers:
+            # crowded cells
+            f = _Fisher(tuple(int(v) for v in rng.integers(5, 10, 2)), rng.integers(0, 2, rng.integers(10)))
+            index.add(f)
+            fishers.append(f)
+        elif action == 1:
+            index.remove(fishers.pop(rng.integers(len(fishers))))
+        else:
+            f = fishers[rng.integers(len(fishers))]
+            if rng.random() < 0.2:
+                f.last_catches.clear()
+            f.last_catches.append(int(rng.integers(2)))
+            index.update_catches(f)
+
+        for pos, radius, include_center in [((7, 7), 2, False), ((0, 3), 5, True), ((rng.integers(15), 9), 1, False)]:
+            best = _brute_force_best(fishers, index, pos, radius, include_center)
+            cell = index.best_within(pos, radius, include_center=include_center)
+            if best == 0:
+                assert cell is None
+            else:
+                assert cell != pos or include_center
+                assert index.best_catch[cell] == best
+                assert any(f.pos == cell and index.n_catches[index.slots[f]] == best for f in fishers)
+
+
+@pytest.mark.parametrize("scheduler", ["random", "event"])
+def test_model_best_catch_raster(scheduler):
+    model = IceFishingModel(width=20, height=20, n_agents=50, agent_model="imitator", scheduler=scheduler, seed=0)
+    for _ in range(60):
+        model.step()
+        model.materialise()
+        expected = np.zeros((20, 20), dtype=int)
+        for agent in model.fishing_index.agents:
+            expected[agent.pos] = max(expected[agent.pos], agent.last_catches.total)
+        assert np.array_equal(model.fishing_index.best_catch, expected)
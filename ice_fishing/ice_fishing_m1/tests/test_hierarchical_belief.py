@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from ice_fishing.ice_fishing_m1.belief import Belief
+from ice_fishing.ice_fishing_m1.hierarchical_belief import HierarchicalBelief
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.social_field import SocialField
+
+
+def _measurements(rng, width, height, n_updates=5):
+    for _ in range(n_updates):
+        social = SocialField(width, height)
+        for x, y in rng.integers(0, [width, height], (8, 2)):
+            social.add((int(x), int(y)))
+        own = tuple(int(v) for v in rng.integers(0, [width, height]))
+        locs = tuple(tuple(int(v) for v in loc) for loc in rng.integers(0, [width, height], (3, 2))) + (own,)
+        rates = tuple(rng.random(4))
+        yield social, own, locs, rates
+
+
+def _update(belief, social, own, locs, rates):
+    belief.use_social_field(social, exclude=own)
+    belief.update_catch_likelihood(locs, rates)
+    belief.apply_likelihoods()
+
+
+def test_block_size_one_is_exact():
+    exact = Belief(20, 15, log_domain=True)
+    hierarchical = HierarchicalBelief(20, 15, block_size=1, attention_radius=4)
+    exact.update_prior_belief()
+    hierarchical.update_prior_belief()
+
+    for measurements in _measurements(np.random.default_rng(0), 20, 15):
+        _update(exact, *measurements)
+        _update(hierarchical, *measurements)
+        assert np.allclose(hierarchical.belief, exact.belief)
+        # the likelihoods of the update, also after the other agents moved
+        measurements[0].add((0, 0))
+        assert np.allclose(hierarchical.social_likelihood, exact.social_likelihood)
+        assert np.allclose(hierarchical.catch_likelihood, exact.catch_likelihood)
+
+
+def test_greedy_cell_is_best_cell():
+    belief = HierarchicalBelief(70, 50, block_size=8)
+    belief.update_prior_belief()
+    rng = np.random.default_rng(1)
+    for measurements in _measurements(rng, 70, 50, n_updates=10):
+        _update(belief, *measurements)
+        full = belief.log_belief
+        x, y = belief.greedy_cell(rng)
+        assert full[x, y] == full.max()
+
+
+def test_collapsed_tiles_keep_block_belief():
+    belief = HierarchicalBelief(64, 64, block_size=8, attention_radius=4)
+    belief.update_prior_belief()
+    social, own, locs, rates = next(_measurements(np.random.default_rng(2), 64, 64))
+    _update(belief, social, own, locs, rates)
+    before = belief.belief.reshape(8, 8, 8, 8).sum(axis=(1, 3))
+
+    # attend to a far away place only
+    belief.update_catch_likelihood(((60, 60),), (0.0,))
+    belief.use_social_field(None)
+    belief._attend(belief._blocks_near(((60, 60),), 4))
+    assert set(belief._tiles) == {(7, 7)}
+    assert np.allclose(belief.belief.reshape(8, 8, 8, 8).sum(axis=(1, 3)), before)
+
+
+def test_memory_scales_with_attended_area():
+    belief = HierarchicalBelief(2000, 2000, block_size=16)
+    belief.update_prior_belief()
+    belief.update_catch_likelihood(((1000, 1000), (1005, 990)), (0.5, 0.2))
+    belief.apply_likelihoods()
+    assert belief.nbytes < 2000 * 2000 * 8 / 100
+
+
+def test_social_block_means():
+    rng = np.random.default_rng(3)
+    social = SocialField(37, 29)
+    social.block_means(8)
+    for x, y in rng.integers(0, [37, 29], (20, 2)):
+        social.add((int(x), int(y)))
+    social.remove((int(x), int(y)))
+
+    padded = np.full((40, 32), np.nan)
+    padded[:37, :29] = social.field
+    expected = np.nanmean(padded.reshape(5, 8, 4, 8).transpose(0, 2, 1, 3).reshape(5, 4, 64), axis=2)
+    assert np.allclose(social.block_means(8), expected)
+
+
+@pytest.mark.parametrize("scheduler", ["random", "event"])
+def test_model_with_hierarchical_beliefs(scheduler):
+    model = IceFishingModel(width=120, height=90, n_agents=10, agent_model="greedy_bayesian",
+                            belief_mode="hierarchical", scheduler=scheduler, seed=0)
+    assert len(model.belief_bank.beliefs) == 0
+    model.run_model(80)
+    assert model.total_catch > 0
+    for agent in model.fishers:
+        assert isinstance(agent.belief, HierarchicalBelief)
+        assert np.isclose(agent.belief.belief.sum(), 1)
+
+    with pytest.raises(ValueError):
+        IceFishingModel(belief_mode="unknown")
+    with pytest.raises(ValueError):
+        IceFishingModel(belief_mode="hierarchical", compact_beliefs=True)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.utils import kernels
+from ice_fishing.ice_fishing_m1.utils.kernels import KernelBackend, get_backend
+from ice_fishing.ice_fishing_m1.utils.utils import disk_stencil, draw_catches, stamp_disk
+
+requires_numba = pytest.mark.skipif(kernels.numba is None, reason="numba is not installed")
+BACKENDS = ["numpy", pytest.param("numba", marks=requires_numba)]
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_stamp_disk_loop_matches_numpy(dtype):
+    # the scalar loop is the source of the numba kernel
+    for x, y, radius, weight in [(0, 0, 3, 1.0), (5, 7, 2, -0.1), (9, 1, 5, 0.3), (20, 20, 3, 2.0)]:
+        expected = stamp_disk(np.zeros((10, 12), dtype=dtype), x, y, radius, weight)
+        actual = np.zeros((10, 12), dtype=dtype)
+        kernels._stamp_disk_loop(actual, x, y, disk_stencil(radius), actual.dtype.type(weight))
+        assert np.array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_kernels_match_reference(backend):
+    backend = get_backend(backend)
+
+    for dtype in (np.float64, np.float32):
+        expected = stamp_disk(np.zeros((10, 12), dtype=dtype), 2, 11, 3, 0.7)
+        assert np.array_equal(backend.stamp_disk(np.zeros((10, 12), dtype=dtype), 2, 11, 3, 0.7), expected)
+
+    assert backend.step_towards((3, 3), (5, 1)) == (4, 2)
+    assert backend.step_towards((3, 3), (3, 3)) == (3, 3)
+    assert backend.catch_trial(50, 0.49, 100) and not backend.catch_trial(50, 0.5, 100)
+    assert not backend.catch_trial(1000, 0.8, 100)
+
+    for n_fish in (0, 5, 90, 1000):
+        outcomes = backend.draw_catches(n_fish, 99, 100, np.random.default_rng(n_fish))
+        assert np.array_equal(outcomes, draw_catches(n_fish, 99, 100, np.random.default_rng(n_fish)))
+
+
+def test_backend_selection():
+    assert get_backend("numpy") is get_backend("numpy")
+    assert get_backend("auto").name == ("numpy" if kernels.numba is None else "numba")
+    with pytest.raises(ValueError):
+        KernelBackend("fortran")
+    if kernels.numba is None:
+        with pytest.raises(ImportError):
+            IceFishingModel(kernel_backend="numba")
+
+
+@requires_numba
+@pytest.mark.parametrize("scheduler", ["random", "event"])
+def test_backends_give_identical_runs(scheduler):
+    runs = []
+    for backend in ("numpy", "numba"):
+        model = IceFishingModel(n_agents=10, agent_model="greedy_bayesian", scheduler=scheduler, seed=3,
+                                kernel_backend=backend)
+        model.run_model(100)
+        runs.append((model.total_catch, model.resource_map.copy(), model.social_field.field.copy(),
+                     [agent.pos for agent in model.fishers]))
+    assert runs[0][0] == runs[1][0]
+    assert np.array_equal(runs[0][1], runs[1][1])
+    assert np.array_equal(runs[0][2], runs[1][2])
+    assert runs[0][3] == runs[1][3]
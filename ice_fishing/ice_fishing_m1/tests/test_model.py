@@ -1,5 +1,7 @@
+import numpy as np
 import pytest
 from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.utils.utils import mean_catch_ratio
 
 
 def tests_init():
@@ -21,3 +23,132 @@ def tests_init():
     for _ in range(10):
         model.step()
 
+
+@pytest.mark.parametrize("agent_model", ["random", "imitator", "greedy_bayesian"])
+def test_beliefs_only_for_consumers(agent_model):
+    model = IceFishingModel(width=20, height=20, agent_model=agent_model)
+    uses_belief = agent_model == "greedy_bayesian"
+
+    assert len(model.belief_bank.beliefs) == (5 if uses_belief else 0)
+    model.run_model(30)
+    assert all((agent.belief is not None) == uses_belief for agent in model.schedule.agents)
+
+    recorded = IceFishingModel(width=20, height=20, agent_model=agent_model, record_beliefs=True)
+    recorded.run_model(30)
+    assert all(agent.belief is not None for agent in recorded.schedule.agents)
+    assert np.allclose(recorded.belief_bank.beliefs.sum(axis=(1, 2)), 1)
+
+
+def test_gaussian_resource_map_option():
+    model = IceFishingModel(width=50, height=40, fish_patch_n_samples=2000, resource_map="gaussian")
+    assert model.resource_map.shape == (50, 40)
+    assert model.resource_map.sum() == 2000
+    model.run_model(10)
+
+    with pytest.raises(ValueError):
+        IceFishingModel(resource_map="unknown")
+    with pytest.raises(ValueError):
+        IceFishingModel(resource_map="gaussian", fish_patch_std=0.8)
+
+
+def test_catch_accounting():
+    model = IceFishingModel(width=20, height=20, n_agents=8, fish_patch_n_samples=5000)
+    model.run_model(100)
+
+    assert len(model.fishers) == 8
+
+    assert model.total_catch == sum(agent.total_catch for agent in model.fishers)
+    assert model.remaining_fish == model.resource_map.sum() == 5000 - model.total_catch
+    assert model.datacollector.model_vars["Mean catch ratio"][-1] == \
+        mean_catch_ratio([agent.total_catch for agent in model.fishers], 5000)
+
+
+def test_seed_reproduces_runs():
+    def run(**kwargs):
+        model = IceFishingModel(width=30, height=30, n_agents=5, fish_patch_n_samples=5000,
+                                agent_model="greedy_bayesian", **kwargs)
+        model.run_model(50)
+        ratios = model.datacollector.get_model_vars_dataframe()["Mean catch ratio"].tolist()
+        return model, ratios, [a.pos for a in model.fishers]
+
+    model, ratios, positions = run(seed=1)
+    assert model.seed == 1
+    assert run(seed=1)[1:3] == (ratios, positions)
+    assert run(seed=2)[1:3] != (ratios, positions)
+
+    # an unseeded run can be reproduced from its seed
+    model, ratios, positions = run()
+    assert run(seed=model.seed)[1:3] == (ratios, positions)
+
+    # the same lake for all seeds, unless it is derived from the model seed
+    def lake(**kwargs):
+        return IceFishingModel(width=30, height=30, fish_patch_n_samples=5000, **kwargs).resource_map
+
+    assert np.array_equal(lake(seed=1), lake(seed=2))
+    assert not np.array_equal(lake(seed=1, resource_map_seed=None), lake(seed=2, resource_map_seed=None))
+
+
+def test_instrumentation():
+    model = IceFishingModel(width=30, height=30, n_agents=5, agent_model="greedy_bayesian", seed=0,
+                            instrumentation=True, instrumentation_columns=True)
+    model.run_model(40)
+
+    stats = model.stats.as_dict()
+    assert stats["schedule calls"] == stats["data_collection calls"] == 40
+    assert stats["agent_step calls"] == stats["select_next_action calls"] == 200
+    assert stats["move calls"] + stats["fish calls"] == 200
+    assert 0 < stats["update_belief calls"] == stats["belief_normalizations"]
+    assert stats["neighbour_queries"] >= stats["update_belief calls"]
+    assert 0 <= stats["scheduling time"] < stats["schedule time"]
+
+    results = model.datacollector.get_model_vars_dataframe()
+    assert results["agent_step calls"].tolist() == [5 * (i + 1) for i in range(40)]
+
+    # the same results as without instrumentation
+    plain = IceFishingModel(width=30, height=30, n_agents=5, agent_model="greedy_bayesian", seed=0)
+    plain.run_model(40)
+    assert plain.stats is None
+    assert "step" not in vars(plain.fishers[0])
+    assert plain.datacollector.get_model_vars_dataframe()["Mean catch ratio"].tolist() == \
+        results["Mean catch ratio"].tolist()
+
+    with pytest.raises(ValueError):
+        IceFishingModel(instrumentation_columns=True)
+
+
+@pytest.mark.parametrize("scheduler", ["random", "event"])
+def test_early_stopping(scheduler):
+    def run(**kwargs):
+        model = IceFishingModel(width=20, height=20, n_agents=10, fish_patch_n_samples=500, fish_catch_threshold=10,
+                                agent_model="imitator", scheduler=scheduler, seed=0, **kwargs)
+        model.run_model(300)
+        return model, model.datacollector.model_vars["Mean catch ratio"]
+
+    full_model, full = run()
+    assert full_model.running and full_model.stop_reason is None
+
+    model, ratios = run(stop_fish_fraction=0.9)
+    assert model.stop_reason == "depleted"
+    stop = model.schedule.steps
+    assert stop < 300 and model.remaining_fish <= 450 < model.initial_fish
+    assert ratios == full[:stop]
+    # the data of a stopped model is not padded, also when it is run again
+    model.run_model(10)
+    assert model.schedule.steps == stop and len(ratios) == stop
+
+    model, ratios = run(plateau_window=20, plateau_tolerance=0.005)
+    assert model.stop_reason == "plateau"
+    stop = model.schedule.steps
+    assert max(full[stop - 21:stop]) - min(full[stop - 21:stop]) <= 0.005 and len(ratios) == stop
+
+    model, _ = run(stop_condition=lambda m: m.schedule.steps == 42)
+    assert model.stop_reason == "condition" and model.schedule.steps == 42
+
+
+@pytest.mark.parametrize("plateau_window", [3, 5, 10])
+def test_no_plateau_before_the_first_catch(plateau_window):
+    model = IceFishingModel(plateau_window=plateau_window, seed=0)
+    model.run_model(plateau_window + 2)
+    # the fishers are still drilling, the catch ratio is 0
+    assert model.total_catch == 0
+    assert model.running and model.stop_reason is None
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.model_vectorized import VectorizedIceFishingModel
+
+
+def test_init():
+    model = VectorizedIceFishingModel(width=30, height=30, n_agents=20, seed=0)
+    assert model.states == ["initial"] * 20
+
+    model.step()
+    assert model.states == ["moving"] * 20
+    assert model.schedule.steps == 1
+
+    model.run_model(100)
+    assert np.all(model.pos >= 0) and np.all(model.pos < 30)
+    assert model.resource_map.min() >= 0
+    assert model.resource_map.sum() + model.total_catch.sum() == 100_000
+
+
+def test_unknown_agent_model():
+    with pytest.raises(ValueError):
+        VectorizedIceFishingModel(agent_model="unknown")
+
+
+@pytest.mark.parametrize("agent_model", ["random", "imitator", "greedy_bayesian"])
+def test_catch_ratio_matches_mesa_engine(agent_model, assert_same_catch_ratios):
+    assert_same_catch_ratios(IceFishingModel, VectorizedIceFishingModel, agent_model)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.raster import RasterGrid, quantize, encode_frame, decode_frame, resource_map, \
+    belief_of_agent, fisher_markers
+
+
+def test_quantize():
+    frame = quantize(np.array([[-1, 0, 10], [20, 30, 5]]), vmin=0, vmax=20)
+    assert frame.dtype == np.uint8
+    assert frame.tolist() == [[0, 0, 128], [255, 255, 64]]
+
+    # an empty range does not divide by zero
+    assert quantize(np.array([0, 1, 2]), vmin=1, vmax=1).tolist() == [0, 0, 255]
+
+
+def test_encode_decode_frame():
+    rng = np.random.default_rng(0)
+    previous = rng.integers(0, 256, (30, 20), dtype=np.uint8)
+    frame = previous.copy()
+    frame[3, 4] = 7
+    frame[29, 19] = 0
+
+    delta = encode_frame(frame, previous)
+    assert delta["type"] == "delta"
+    assert np.array_equal(decode_frame(delta, previous), frame)
+
+    key = encode_frame(frame)
+    assert key["type"] == "key"
+    assert np.array_equal(decode_frame(key), frame)
+
+    # too many changes are sent as a key frame
+    assert encode_frame(rng.integers(0, 256, (30, 20), dtype=np.uint8), previous)["type"] == "key"
+
+
+def test_raster_grid_follows_the_model():
+    model = IceFishingModel(width=40, height=30, n_agents=5, fish_patch_n_samples=20_000,
+                            agent_model="greedy_bayesian")
+    resource = RasterGrid(resource_map, vmin=0, vmax=20, markers=fisher_markers)
+    belief = RasterGrid(belief_of_agent("belief"), vmin=0, vmax=0.05)
+
+    agent_1 = next(a for a in model.schedule.agents if a.unique_id == 1)
+
+    resource_frame = belief_frame = None
+    for _ in range(60):
+        message = resource.render(model)
+        resource_frame = decode_frame(message, resource_frame)
+        belief_frame = decode_frame(belief.render(model), belief_frame)
+        assert np.array_equal(resource_frame, quantize(model.resource_map, 0, 20))
+        assert np.array_equal(belief_frame, quantize(agent_1.belief.belief, 0, 0.05))
+        assert len(message["markers"]) == 5
+        model.step()
+
+    # a new model starts with a key frame
+    assert resource.render(IceFishingModel(width=40, height=30))["type"] == "key"
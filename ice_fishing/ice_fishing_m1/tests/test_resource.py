@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.resource import ResourceDynamics
+
+
+def test_movement_conserves_fish():
+    rng = np.random.default_rng(0)
+    resource_map = rng.poisson(3, (40, 30)).astype(float)
+    total = resource_map.sum()
+    dynamics = ResourceDynamics(diffusion=0.1, drift=(0.3, -0.2))
+    for _ in range(50):
+        dynamics.step(resource_map, None, rng)
+        assert resource_map.sum() == total
+        assert np.all(resource_map >= 0) and np.all(resource_map == np.round(resource_map))
+
+    # fish leave the lake at the edges
+    open_lake = ResourceDynamics(diffusion=0.1, conserve=False)
+    open_lake.step(resource_map, None, rng)
+    assert resource_map.sum() < total
+
+
+def test_expected_movement_is_convolution():
+    rng = np.random.default_rng(1)
+    dynamics = ResourceDynamics(diffusion=0.1, drift=(0.2, -0.1))
+    resource_map = np.zeros((9, 9))
+    resource_map[4, 4] = 100_000
+    moved = resource_map.copy()
+    dynamics.step(moved, None, rng)
+
+    # moves to the larger x, the smaller x, the larger y and the smaller y
+    stencil = np.zeros((3, 3))
+    stencil[1, 1] = 0.3
+    stencil[0, 1], stencil[2, 1], stencil[1, 0], stencil[1, 2] = 0.3, 0.1, 0.1, 0.2
+    expected = ndimage.correlate(resource_map, stencil, mode="constant")
+    assert moved.sum() == 100_000
+    assert np.allclose(moved, expected, atol=1000)
+
+
+def test_logistic_regrowth():
+    rng = np.random.default_rng(2)
+    capacity = np.array([[100.0, 100.0, 0.0, 50.0]])
+    dynamics = ResourceDynamics(growth_rate=0.2)
+
+    growth = []
+    for _ in range(2000):
+        resource_map = np.array([[50.0, 0.0, 0.0, 80.0]])
+        dynamics.step(resource_map, capacity, rng)
+        growth.append(resource_map[0] - [50, 0, 0, 80])
+    growth = np.array(growth)
+    assert np.all(growth == np.round(growth))
+    assert np.allclose(growth.mean(axis=0), [5, 0, 0, -9.6], atol=0.1)
+
+    # towards the capacity, empty cells stay empty
+    resource_map = np.array([[1.0, 0.0, 0.0, 80.0]])
+    for _ in range(200):
+        dynamics.step(resource_map, capacity, rng)
+    assert np.allclose(resource_map, [[100, 0, 0, 50]], atol=8)
+
+    # fish in a cell without capacity do not grow
+    resource_map = np.array([[0.0, 0.0, 10.0, 0.0]])
+    for _ in range(10):
+        dynamics.step(resource_map, capacity, rng)
+    assert resource_map.tolist() == [[0, 0, 10, 0]]
+
+    with pytest.raises(ValueError):
+        ResourceDynamics(diffusion=0.2, drift=(0.3, 0.0))
+
+
+def test_repr_identifies_capacity_map():
+    capacity = np.ones((5, 5))
+    other = capacity.copy()
+    other[2, 2] = 2
+    dynamics = repr(ResourceDynamics(carrying_capacity=capacity))
+    assert dynamics == repr(ResourceDynamics(carrying_capacity=np.ones((5, 5))))
+    assert dynamics != repr(ResourceDynamics(carrying_capacity=other))
+    assert "carrying_capacity=50" in repr(ResourceDynamics(carrying_capacity=50))
+
+
+def test_model_with_resource_dynamics():
+    dynamics = ResourceDynamics(growth_rate=0.1, diffusion=0.05)
+    model = IceFishingModel(width=20, height=20, n_agents=10, fish_patch_n_samples=5000, fish_catch_threshold=10,
+                            agent_model="imitator", resource_dynamics=dynamics, seed=0)
+    initial = model.resource_map.copy()
+    model.run_model(50)
+    assert model.remaining_fish == model.resource_map.sum()
+    assert not np.array_equal(model.resource_map, initial)
+    # the carrying capacity is the initial lake
+    assert np.array_equal(model.carrying_capacity, initial)
+
+    # the fish that move to the cells without capacity of the initial lake do not grow there
+    model = IceFishingModel(n_agents=5, seed=0, resource_dynamics=ResourceDynamics(growth_rate=0.2, diffusion=0.05))
+    model.run_model(100)
+    assert model.remaining_fish <= model.carrying_capacity.sum()
+
+    with pytest.raises(ValueError):
+        IceFishingModel(resource_dynamics=dynamics, scheduler="event")
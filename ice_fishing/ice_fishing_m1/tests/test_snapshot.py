@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.snapshot import fork, load_snapshot, save_snapshot
+from ice_fishing.ice_fishing_m1.sweep import load_sweep, sweep
+from ice_fishing.ice_fishing_m1.utils.cache import file_digest
+
+
+def _state(model):
+    return (model.schedule.steps, model.total_catch, model.remaining_fish, model.resource_map.tolist(),
+            [(agent.pos, agent.state, agent.total_catch, list(agent.last_catches)) for agent in model.fishers],
+            model.datacollector.model_vars["Mean catch ratio"])
+
+
+@pytest.mark.parametrize("options", [
+    dict(agent_model="greedy_bayesian"),
+    dict(agent_model="greedy_bayesian", compact_beliefs=True, scheduler="event"),
+    dict(agent_model="greedy_bayesian", belief_mode="hierarchical"),
+    dict(agent_model="imitator", scheduler="event"),
+])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_restored_model_continues(tmp_path, options, mmap):
+    model = IceFishingModel(width=40, height=30, n_agents=8, seed=1, **options)
+    model.run_model(40)
+    path = save_snapshot(model, tmp_path / "burn_in.snap")
+    restored = load_snapshot(path, mmap=mmap)
+    assert _state(restored) == _state(model)
+
+    model.run_model(40)
+    restored.run_model(40)
+    assert _state(restored) == _state(model)
+    for agent, restored_agent in zip(model.fishers, restored.fishers):
+        assert np.array_equal(restored_agent.belief.log_belief, agent.belief.log_belief) \
+            if agent.belief is not None else restored_agent.belief is None
+
+
+def test_snapshot_shares_memory(tmp_path):
+    model = IceFishingModel(width=40, height=30, n_agents=8, agent_model="greedy_bayesian", seed=1)
+    model.run_model(20)
+    path = save_snapshot(model, tmp_path / "burn_in.snap")
+    digest = file_digest(path)
+
+    first, second = load_snapshot(path), load_snapshot(path)
+    # the beliefs are still rows of the belief bank
+    for agent in first.fishers:
+        assert np.shares_memory(agent.belief.belief, first.belief_bank.beliefs)
+    assert isinstance(first.resource_map.base, np.memmap)
+
+    # copy-on-write
+    first.run_model(20)
+    first.resource_map[...] = 0
+    assert np.array_equal(second.resource_map, model.resource_map)
+    assert file_digest(path) == digest
+
+
+def test_fork(tmp_path):
+    model = IceFishingModel(width=40, height=30, n_agents=8, seed=1)
+    model.run_model(20)
+    path = save_snapshot(model, tmp_path / "burn_in.snap")
+
+    variants = [fork(path, seed=seed, fish_catch_threshold=50) for seed in (1, 1, 2)]
+    for variant in variants:
+        assert variant.fish_catch_threshold == 50
+        variant.run_model(30)
+    assert _state(variants[0]) == _state(variants[1])
+    assert _state(variants[0]) != _state(variants[2])
+
+    # a fresh seed without a seed
+    unseeded = [fork(path) for _ in range(2)]
+    for variant in unseeded:
+        variant.run_model(30)
+    assert _state(unseeded[0]) != _state(unseeded[1])
+
+    with pytest.raises(ValueError):
+        fork(path, n_fish=5)
+    # constructor parameters do not take effect in a fork
+    with pytest.raises(ValueError):
+        fork(path, n_agents=50)
+    with pytest.raises(ValueError):
+        save_snapshot(IceFishingModel(instrumentation=True), tmp_path / "instrumented.snap")
+    (tmp_path / "other.snap").write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        load_snapshot(tmp_path / "other.snap")
+
+
+def test_sweep_from_snapshot(tmp_path):
+    model = IceFishingModel(width=20, height=20, fish_patch_n_samples=2000, resource_map_cache_dir=None, seed=0)
+    model.run_model(10)
+    path = save_snapshot(model, tmp_path / "burn_in.snap")
+    burn_in = model.datacollector.model_vars["Mean catch ratio"]
+
+    args = dict(parameters={"fish_catch_threshold": (50, 100)}, iterations=2, max_steps=20, data_collection_period=1,
+                display_progress=False, seed=3, snapshot=path)
+    sweep(tmp_path / "serial", number_processes=1, **args)
+    sweep(tmp_path / "parallel", number_processes=2, **args)
+    results = load_sweep(tmp_path / "serial")
+    assert results.equals(load_sweep(tmp_path / "parallel"))
+
+    assert len(results) == 4 * 21
+    for _, run in results.groupby("RunId"):
+        assert run["Mean catch ratio"].tolist()[:10] == burn_in
+
+    # the iterations of an unseeded sweep differ
+    unseeded = load_sweep(sweep(tmp_path / "unseeded", number_processes=1, **{**args, "seed": None, "iterations": 3}))
+    runs = unseeded.groupby("RunId")["Mean catch ratio"].apply(tuple)
+    assert runs.nunique() > 2
+
+    with pytest.raises(ValueError):
+        sweep(tmp_path / "constructor", number_processes=1, **{**args, "parameters": {"n_agents": (5, 50)}})
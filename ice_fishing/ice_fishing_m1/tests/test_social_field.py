@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+
+from ice_fishing.ice_fishing_m1.agent_fisher import BaseIceFisher
+from ice_fishing.ice_fishing_m1.belief import Belief
+from ice_fishing.ice_fishing_m1.hierarchical_belief import HierarchicalBelief
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.social_field import SocialField
+
+
+def test_rebuild_matches_incremental_updates():
+    locs = ((0, 0), (5, 5), (5, 5), (19, 3), (10, 19))
+    field = SocialField(20, 20)
+    for loc in locs:
+        field.add(loc)
+
+    rebuilt = SocialField(20, 20)
+    rebuilt.rebuild(locs)
+
+    assert np.array_equal(field.counts, rebuilt.counts)
+    assert np.allclose(field.field, rebuilt.field)
+
+    field.remove((5, 5))
+    rebuilt.rebuild(((0, 0), (5, 5), (19, 3), (10, 19)))
+    assert np.allclose(field.field, rebuilt.field)
+    assert sorted(field.locations()) == sorted(rebuilt.locations()) == [(0, 0), (5, 5), (10, 19), (19, 3)]
+    assert sorted(field.locations(exclude=(5, 5))) == [(0, 0), (10, 19), (19, 3)]
+
+
+def test_likelihood_excludes_own_cell():
+    locs = ((3, 3), (3, 3), (12, 8))
+    field = SocialField(20, 20)
+    field.rebuild(locs)
+
+    belief = Belief(20, 20)
+    belief.update_social_likelihood(((12, 8),))
+    assert np.allclose(field.likelihood(exclude=(3, 3)), belief.social_likelihood)
+
+    belief.update_social_likelihood(locs)
+    assert np.allclose(field.likelihood(), belief.social_likelihood)
+
+
+def test_model_social_field_matches_neighbour_scan():
+    model = IceFishingModel(width=20, height=20, n_agents=10, agent_model="greedy_bayesian")
+
+    for _ in range(30):
+        model.step()
+
+        fishers = [a for a in model.schedule.agents if isinstance(a, BaseIceFisher)]
+        for agent in fishers:
+            others = tuple(a.pos for a in fishers if a.state == "fishing" and a.pos != agent.pos)
+            belief = Belief(20, 20)
+            belief.update_social_likelihood(others)
+            assert np.allclose(model.social_field.likelihood(exclude=agent.pos), belief.social_likelihood)
+
+
+def _update_time(size):
+    field = SocialField(size, size)
+    for loc in ((5, 5), (5, 5), (12, 8), (30, 30)):
+        field.add(loc)
+    belief = HierarchicalBelief(size, size, block_size=16)
+    times = []
+    for _ in range(20):
+        start = time.perf_counter()
+        field.remove((5, 5))
+        field.add((6, 5))
+        belief.use_social_field(field, exclude=(12, 8))
+        field.remove((6, 5))
+        field.add((5, 5))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def test_update_cost_does_not_grow_with_grid_size():
+    # a scan of the 2000 x 2000 grid takes milliseconds, the updates of a few agents microseconds
+    assert _update_time(2000) < 10 * _update_time(40) + 1e-4
@@ -0,0 +1,188 @@
+import os
+
+import mesa
+import numpy as np
+import pandas as pd
+import pytest
+
+from ice_fishing.ice_fishing_m1.model import IceFishingModel
+from ice_fishing.ice_fishing_m1.sweep import sweep, load_sweep, condition_stats, FinalValue, EveryK, WindowStats, \
+    Welford
+
+PARAMS = {"width": 20, "height": 20, "fish_patch_n_samples": (500, 2000), "agent_model": ("random", "imitator"),
+          "resource_map_cache_dir": None}
+
+
+class _SeededModel(IceFishingModel):
+    """
+    Every run of the same parameters gives the same results
+    """
+    n_instances = 0
+
+    def __init__(self, **kwargs):
+        _SeededModel.n_instances += 1
+        kwargs.setdefault("seed", 0)
+        super().__init__(**kwargs)
+
+
+@pytest.mark.parametrize("data_collection_period", [1, 7, -1])
+def test_sweep_matches_batch_run(tmp_path, data_collection_period):
+    args = dict(parameters=PARAMS, iterations=2, max_steps=20, number_processes=1,
+                data_collection_period=data_collection_period, display_progress=False)
+    expected = pd.DataFrame(mesa.batch_run(_SeededModel, **args))
+
+    sweep(tmp_path, model_cls=_SeededModel, **args)
+    pd.testing.assert_frame_equal(load_sweep(tmp_path), expected)
+
+
+def test_sweep_resumes(tmp_path):
+    args = dict(parameters=PARAMS, iterations=2, max_steps=10, model_cls=_SeededModel, display_progress=False)
+    sweep(tmp_path, **args)
+    results = load_sweep(tmp_path)
+    assert all(type(name) is str for name in results.columns)
+
+    os.remove(tmp_path / "run_000003.npz")
+    (tmp_path / "run_000005.npz.123.tmp").write_bytes(b"interrupted")
+    _SeededModel.n_instances = 0
+    sweep(tmp_path, **args)
+    assert _SeededModel.n_instances == 1
+    assert not list(tmp_path.glob("*.tmp"))
+    pd.testing.assert_frame_equal(load_sweep(tmp_path), results)
+
+    # a different sweep in the same directory
+    with pytest.raises(ValueError):
+        sweep(tmp_path, **{**args, "max_steps": 11})
+
+
+def test_sweep_processes(tmp_path):
+    sweep(tmp_path, PARAMS, iterations=2, max_steps=10, number_processes=2, data_collection_period=1,
+          display_progress=False)
+    results = load_sweep(tmp_path)
+    assert len(results) == 8 * 11
+    assert list(results.columns) == ["RunId", "iteration", "Step", *PARAMS, "Mean catch ratio"]
+    assert list(results["RunId"].unique()) == list(range(8))
+
+
+class _CountingModel(IceFishingModel):
+    """
+    Every run gives different results, the same in every sweep
+    """
+    n_instances = 0
+
+    def __init__(self, **kwargs):
+        _CountingModel.n_instances += 1
+        super().__init__(seed=_CountingModel.n_instances, **kwargs)
+
+
+def _full_sweep(path, **kwargs):
+    _CountingModel.n_instances = 0
+    sweep(path, PARAMS, iterations=3, max_steps=30, data_collection_period=1, model_cls=_CountingModel,
+          display_progress=False, **kwargs)
+    return load_sweep(path)
+
+
+@pytest.mark.parametrize("reducer", [FinalValue(), EveryK(7)])
+def test_step_reducers(tmp_path, reducer):
+    full = _full_sweep(tmp_path / "full")
+    reduced = _full_sweep(tmp_path / "reduced", reducer=reducer)
+
+    last = full["Step"] == full["Step"].max()
+    keep = last if isinstance(reducer, FinalValue) else last | (full["Step"] % 7 == 0)
+    pd.testing.assert_frame_equal(reduced, full[keep].reset_index(drop=True))
+
+
+def test_window_stats(tmp_path):
+    full = _full_sweep(tmp_path / "full")
+    reduced = _full_sweep(tmp_path / "reduced", reducer=WindowStats(10, 20, stats=("mean", "min", "max")))
+
+    window = full[(full["Step"] >= 10) & (full["Step"] < 20)]
+    expected = window.groupby("RunId")["Mean catch ratio"].agg(["mean", "min", "max"])
+    assert len(reduced) == 12
+    for stat in ("mean", "min", "max"):
+        assert np.allclose(reduced[f"Mean catch ratio {stat}"], expected[stat])
+    assert "Step" not in reduced
+
+
+def test_welford():
+    values = np.random.default_rng(0).random((20, 3))
+    welford = Welford()
+    for row in values:
+        welford.update(row)
+    assert welford.n == 20
+    assert np.allclose(welford.mean, values.mean(axis=0))
+    assert np.allclose(welford.variance, values.var(axis=0, ddof=1))
+
+
+@pytest.mark.parametrize("reducer", [FinalValue(), EveryK(10)])
+def test_condition_stats(tmp_path, reducer):
+    full = _full_sweep(tmp_path, reducer=reducer)
+
+    _CountingModel.n_instances = 0
+    stats = condition_stats(PARAMS, reducer=reducer, iterations=3, max_steps=30, model_cls=_CountingModel,
+                            display_progress=False)
+
+    expected = full.groupby(["fish_patch_n_samples", "agent_model", "Step"], sort=False)["Mean catch ratio"] \
+        .agg(["count", "mean", "var"]).reset_index()
+    assert len(stats) == len(expected)
+    stats = stats.sort_values(["fish_patch_n_samples", "agent_model", "Step"], ignore_index=True)
+    expected = expected.sort_values(["fish_patch_n_samples", "agent_model", "Step"], ignore_index=True)
+    assert (stats["n"] == expected["count"]).all()
+    assert np.allclose(stats["Mean catch ratio mean"], expected["mean"])
+    assert np.allclose(stats["Mean catch ratio var"], expected["var"])
+
+
+def test_seeded_sweep(tmp_path):
+    args = dict(parameters=PARAMS, max_steps=20, data_collection_period=1, display_progress=False, seed=7)
+    results = load_sweep(sweep(tmp_path / "a", iterations=2, **args))
+    assert results.groupby("iteration")["seed"].nunique().tolist() == [1, 1]
+    assert results["seed"].nunique() == 2
+
+    pd.testing.assert_frame_equal(load_sweep(sweep(tmp_path / "b", iterations=2, number_processes=2, **args)),
+                                  results)
+
+
+def test_result_cache(tmp_path):
+    args = dict(parameters=PARAMS, max_steps=20, model_cls=_SeededModel, display_progress=False, seed=3,
+                cache_dir=tmp_path / "cache")
+    _SeededModel.n_instances = 0
+    results = load_sweep(sweep(tmp_path / "a", iterations=2, **args))
+    assert _SeededModel.n_instances == 8
+
+    # an extended sweep only runs the new iteration
+    _SeededModel.n_instances = 0
+    extended = load_sweep(sweep(tmp_path / "b", iterations=3, **args))
+    assert _SeededModel.n_instances == 4
+    pd.testing.assert_frame_equal(extended[extended["iteration"] < 2], results)
+
+    _SeededModel.n_instances = 0
+    condition_stats(iterations=3, reducer=EveryK(5), **args)
+    assert _SeededModel.n_instances == 12
+
+    # parameters whose repr does not identify them cannot be cached
+    with pytest.raises(ValueError):
+        sweep(tmp_path / "c", iterations=1, **{**args, "parameters": {**PARAMS, "stop_condition": lambda m: False}})
+
+
+def test_seeded_condition_stats(tmp_path):
+    stats = condition_stats(PARAMS, iterations=3, max_steps=20, display_progress=False, seed=7)
+    # the seeds of the iterations do not label the conditions
+    assert "seed" not in stats and "seed mean" not in stats
+    assert len(stats) == 4 and (stats["n"] == 3).all()
+
+
+@pytest.mark.parametrize("data_collection_period", [1, 7, -1])
+def test_stopped_runs_keep_their_shape(tmp_path, data_collection_period):
+    params = {**PARAMS, "fish_catch_threshold": 10, "n_agents": 10}
+    args = dict(iterations=1, max_steps=60, data_collection_period=data_collection_period, model_cls=_SeededModel,
+                display_progress=False)
+    sweep(tmp_path / "full", params, **args)
+    sweep(tmp_path / "stopped", {**params, "stop_fish_fraction": 0.95}, **args)
+    full, stopped = load_sweep(tmp_path / "full"), load_sweep(tmp_path / "stopped")
+
+    assert stopped["Step"].tolist() == full["Step"].tolist()
+    for (_, run), (_, full_run) in zip(stopped.groupby("RunId"), full.groupby("RunId")):
+        ratios = run["Mean catch ratio"].to_numpy()
+        # the final value is carried forward
+        assert len(ratios) < 2 or ratios[-1] == ratios[-2]
+        assert ratios[-1] <= full_run["Mean catch ratio"].iloc[-1]
+    assert stopped["Mean catch ratio"].iloc[-1] < full["Mean catch ratio"].iloc[-1]
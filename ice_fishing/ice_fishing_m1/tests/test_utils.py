@@ -1,7 +1,11 @@
 import numpy as np
 import pytest
 
-from ice_fishing.ice_fishing_m1.utils.utils import generate_resource_map, mean_catch_ratio, draw_circe_around_point
+from ice_fishing.ice_fishing_m1.utils import cache
+from ice_fishing.ice_fishing_m1.utils.utils import CatchHistory, catch_rate, draw_catches, generate_resource_map, \
+    mean_catch_ratio, draw_circe_around_point, stamp_disk, sample_resource_map, gaussian_resource_map, \
+    sample_gaussian_resource_map, greedy_argmax
+from scipy.stats import multivariate_normal
 
 
 @pytest.mark.parametrize("cluster_std", [0.1, 0.5, 1.0])
@@ -17,6 +21,88 @@ def test_generate_resource_map(cluster_std):
     assert resource_map.min() >= 0, "The minimum value of the resource map should be greater than 0"
 
 
+@pytest.mark.parametrize("cluster_std", [0.1, 0.5, 1.0])
+def test_sample_resource_map(cluster_std):
+    resource_map = sample_resource_map(100, 80, cluster_std=cluster_std, n_samples=2001)
+
+    assert resource_map.shape == (100, 80)
+    assert resource_map.sum() == 2001
+    assert resource_map.min() >= 0
+    assert np.array_equal(resource_map, sample_resource_map(100, 80, cluster_std=cluster_std, n_samples=2001))
+
+
+@pytest.mark.parametrize("cluster_std", [0.2, 1.0])
+def test_sample_resource_map_matches_blobs(cluster_std):
+    blobs = generate_resource_map(20, 20, cluster_std=cluster_std, n_samples=200_000)
+    other_blobs = generate_resource_map(20, 20, cluster_std=cluster_std, n_samples=200_000, random_seed=1)
+    sampled = sample_resource_map(20, 20, cluster_std=cluster_std, n_samples=200_000)
+
+    # the maps differ only by the sampling noise
+    assert np.abs(blobs - sampled).sum() < 1.5 * np.abs(blobs - other_blobs).sum()
+
+
+def test_cached_resource_map(tmp_path, monkeypatch):
+    calls = []
+
+    def sample(*args, **kwargs):
+        calls.append(args)
+        return sample_resource_map(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "sample_resource_map", sample)
+    monkeypatch.setattr(cache, "_resource_maps", {})
+
+    first = cache.cached_resource_map(30, 30, n_samples=1000, cache_dir=str(tmp_path))
+    first[0, 0] -= 1
+    second = cache.cached_resource_map(30, 30, n_samples=1000, cache_dir=str(tmp_path))
+    assert len(calls) == 1
+    assert second[0, 0] == first[0, 0] + 1, "the cached map should not be modified by its users"
+
+    # another process loads the map from the disk
+    monkeypatch.setattr(cache, "_resource_maps", {})
+    third = cache.cached_resource_map(30, 30, n_samples=1000, cache_dir=str(tmp_path))
+    assert len(calls) == 1
+    assert np.array_equal(second, third)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    cache.cached_resource_map(30, 30, n_samples=2000, cache_dir=str(tmp_path))
+    assert len(calls) == 2
+
+
+def _gaussian_resource_map_loop(width, height, mean, cov_val, random_seed=42, max_value=1):
+    # reference implementation evaluating the pdf cell by cell
+    cov = np.array([[1, cov_val[0]], [cov_val[1], 1]])
+    distr = multivariate_normal(cov=cov, mean=mean, seed=random_seed)
+    x = np.linspace(-3 * cov[0, 0], 3 * cov[0, 0], num=width)
+    y = np.linspace(-3 * cov[1, 1], 3 * cov[1, 1], num=height)
+    X, Y = np.meshgrid(x, y)
+    pdf = np.zeros(X.shape)
+    for i in range(X.shape[0]):
+        for j in range(X.shape[1]):
+            pdf[i, j] = distr.pdf([X[i, j], Y[i, j]])
+    return (pdf / np.max(pdf)) * max_value
+
+
+@pytest.mark.parametrize("width, height, mean, cov_val", [(30, 30, (0, 0), (0, 0)), (40, 25, (1, -0.5), (0.3, 0.3)),
+                                                          (2, 3, (0, 0), (0, 0))])
+def test_gaussian_resource_map_matches_loop(width, height, mean, cov_val):
+    expected = _gaussian_resource_map_loop(width, height, mean, cov_val, max_value=0.8)
+    resource_map = gaussian_resource_map(width, height, mean, cov_val, max_value=0.8)
+
+    assert resource_map.shape == expected.shape
+    assert np.allclose(resource_map, expected, rtol=1e-12)
+
+
+def test_sample_gaussian_resource_map():
+    resource_map = sample_gaussian_resource_map(60, 40, n_samples=5000)
+
+    assert resource_map.shape == (60, 40)
+    assert resource_map.sum() == 5000
+    # the patch is in the middle of the lake
+    x, y = np.indices(resource_map.shape)
+    assert np.isclose((x * resource_map).sum() / 5000, 29.5, atol=0.5)
+    assert np.isclose((y * resource_map).sum() / 5000, 19.5, atol=0.5)
+
+
 def test_mean_catch_ratio():
     result = mean_catch_ratio([1, 1, 1], 10)
     assert result == 0.1
@@ -33,3 +119,81 @@ def test_draw_circe_around_point():
 
     with pytest.raises(AssertionError):
         draw_circe_around_point(array, 50, 50, radius=-1)
+
+
+def _draw_circle_loop(array, x, y, radius):
+    # reference implementation of the disk drawing
+    for xi in range(max(0, x - radius), min(array.shape[0], x + radius + 1)):
+        for yi in range(max(0, y - radius), min(array.shape[1], y + radius + 1)):
+            if (xi - x) ** 2 + (yi - y) ** 2 <= radius ** 2:
+                array[xi, yi] += 1
+    return array
+
+
+@pytest.mark.parametrize("x, y", [(0, 0), (1, 18), (19, 19), (10, 0), (5, 7), (-2, 3)])
+@pytest.mark.parametrize("radius", [1, 3, 5, 30])
+def test_stamp_disk_matches_loop(x, y, radius):
+    expected = _draw_circle_loop(np.zeros((20, 25)), x, y, radius)
+    assert np.array_equal(stamp_disk(np.zeros((20, 25)), x, y, radius), expected)
+
+    weighted = stamp_disk(np.full((20, 25), 1e-5), x, y, radius, weight=0.1)
+    assert np.allclose(weighted, expected * 0.1 + 1e-5)
+
+
+@pytest.mark.parametrize("window_size", [1, 5, 50])
+def test_catch_history_matches_list(window_size):
+    rng = np.random.default_rng(0)
+    history = CatchHistory(window_size=window_size)
+    outcomes = []
+    assert history.rate == 0.0
+    for caught in rng.integers(0, 2, 200):
+        history.append(int(caught))
+        outcomes.append(int(caught))
+
+        window = outcomes[-window_size:]
+        assert list(history) == window
+        assert history.rate == catch_rate(outcomes, window_size) == sum(window) / len(window)
+        assert history.total == sum(outcomes)
+        assert len(history) == len(outcomes)
+
+    history.clear()
+    assert len(history) == history.total == 0
+    assert list(history) == []
+    assert history.rate == 0.0
+
+
+def test_catch_history_large_window():
+    # more catches in the window than the outcome type can hold
+    history = CatchHistory(window_size=200)
+    history.extend([1] * 500)
+    assert history.window_total == 200
+    assert history.rate == 1.0
+    history.extend([0] * 100)
+    assert history.window_total == 100
+    assert history.total == 500
+
+
+@pytest.mark.parametrize("n_fish", [0, 10, 85, 1000])
+def test_draw_catches_matches_loop(n_fish):
+    outcomes = draw_catches(n_fish, 30, catch_threshold=100, rng=np.random.default_rng(0))
+
+    u = np.random.default_rng(0).random(30)
+    expected = []
+    for u_i in u:
+        p_catch = min(n_fish / 100, 0.8)
+        expected.append(int(u_i < p_catch))
+        n_fish -= expected[-1]
+    assert outcomes.tolist() == expected
+
+
+def test_greedy_argmax_breaks_ties_uniformly():
+    values = np.zeros((3, 4, 5))
+    values[0, 2, 3] = 1
+    values[1, [0, 3], [4, 1]] = 2
+    rng = np.random.default_rng(0)
+
+    selected = [greedy_argmax(values, rng) for _ in range(2000)]
+    assert all(s[0].tolist() == [2, 3] for s in selected)
+    assert {tuple(s[1]) for s in selected} == {(0, 4), (3, 1)}
+    counts = np.bincount([np.ravel_multi_index(tuple(s[2]), (4, 5)) for s in selected], minlength=20)
+    assert counts.min() > 2000 / 20 / 2
@@ -0,0 +1,121 @@
+import functools
+import glob
+import hashlib
+import inspect
+import os
+
+import numpy as np
+
+from .utils import sample_resource_map
+
+# resource maps built in this process, by content key
+_resource_maps = {}
+
+
+def resource_map_key(width: int, height: int, cluster_std: float, n_samples: int,
+                     centers: list[list[float]], random_seed: int) -> str:
+    """
+    Content key of a resource map
+    """
+    params = (int(width), int(height), float(cluster_std), int(n_samples),
+              tuple(tuple(float(c) for c in center) for center in centers), random_seed)
+    return hashlib.sha1(repr(params).encode()).hexdigest()
+
+
+def cached_resource_map(width: int, height: int,
+                        cluster_std: float = 0.4,
+                        n_samples: int = 100_000,
+                        centers: list[list[float]] = ((1, 1), (-1, 1), (1, -1), (-1, -1)),
+                        random_seed: int = 42,
+                        cache_dir: str = None) -> np.ndarray:
+    """
+    Resource map from sample_resource_map, built only once per process and, if a cache directory is given, only
+    once across processes. The cached maps are stored as .npy files and memory-mapped when loaded.
+
+    :return: a copy of the cached map, which can be depleted by the model
+    """
+    key = resource_map_key(width, height, cluster_std, n_samples, centers, random_seed)
+    if key not in _resource_maps:
+        path = os.path.join(cache_dir, f"resource_map_{key}.npy") if cache_dir is not None else None
+        if path is not None and os.path.exists(path):
+            resource_map = np.load(path, mmap_mode="r")
+        else:
+            resource_map = sample_resource_map(width, height, cluster_std=cluster_std, n_samples=n_samples,
+                                               centers=centers, random_seed=random_seed)
+            resource_map.setflags(write=False)
+            if path is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                # write to a temporary file first, other processes may read the map concurrently
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, resource_map)
+                os.replace(tmp_path, path)
+        _resource_maps[key] = resource_map
+
+    return np.array(_resource_maps[key])
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """
+    Content hash of the source code of the model package, the tests excluded
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = sorted(glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True))
+    digest = hashlib.sha1()
+    for path in paths:
+        relative_path = os.path.relpath(path, package_dir)
+        if relative_path.startswith("tests"):
+            continue
+        digest.update(relative_path.encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """
+    Content hash of a file, e.g. of a snapshot, computed once per version of the file
+    """
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _check_key_value(name: str, value) -> None:
+    """
+    Raise a ValueError if the repr of the value does not identify it, e.g. of a function or of an array
+    """
+    if isinstance(value, (tuple, list)):
+        for item in value:
+            _check_key_value(name, item)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _check_key_value(name, key)
+            _check_key_value(name, item)
+    elif inspect.isroutine(value) or isinstance(value, (functools.partial, np.ndarray)) or \
+            type(value).__repr__ is object.__repr__:
+        raise ValueError(f"The value of {name} cannot be part of a result key: {value!r}")
+
+
+def result_key(model: str, kwargs: dict, **options) -> str:
+    """
+    Key of the result of a seeded run in the result cache, changes with the code of the model package. The key is
+    built from the reprs of the values, functions, arrays and objects without their own repr are rejected.
+
+    :param model: name of the model class
+    :param kwargs: model parameters, including the seed
+    :param options: further options that change the result, e.g. the number of steps
+    """
+    for name, value in [*kwargs.items(), *options.items()]:
+        _check_key_value(name, value)
+    params = (model, sorted(kwargs.items()), sorted(options.items()), code_version())
+    return hashlib.sha1(repr(params).encode()).hexdigest()
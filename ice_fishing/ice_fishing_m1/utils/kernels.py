@@ -0,0 +1,117 @@
+import numpy as np
+
+from .utils import catch_outcomes, disk_stencil, draw_catches, stamp_disk
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("numpy", "numba", "auto")
+
+
+def _stamp_disk_loop(array: np.ndarray, x: int, y: int, stencil: np.ndarray, weight) -> None:
+    radius = stencil.shape[0] // 2
+    for i in range(max(0, x - radius), min(array.shape[0], x + radius + 1)):
+        for j in range(max(0, y - radius), min(array.shape[1], y + radius + 1)):
+            if stencil[i - x + radius, j - y + radius]:
+                array[i, j] += weight
+
+
+def _step_towards(x: int, y: int, dx: int, dy: int) -> tuple[int, int]:
+    if x < dx:
+        x += 1
+    elif x > dx:
+        x -= 1
+    if y < dy:
+        y += 1
+    elif y > dy:
+        y -= 1
+    return x, y
+
+
+def _catch_trial(n_fish: float, u: float, catch_threshold: float, max_p_catch: float) -> bool:
+    return u < min(n_fish / catch_threshold, max_p_catch)
+
+
+class KernelBackend:
+    def __init__(self, name: str) -> None:
+        """
+        Kernels of the hot loops of the simulation: disk stamping, the one-cell move, the catch draw of a fishing
+        trial and the sequential catch draws of a fishing bout.
+
+        The numba kernels are compiled versions of the scalar loops, the numpy kernels are vectorised where the loop
+        allows it. Both backends give identical results for the same random numbers.
+
+        :param name: "numpy", "numba", or "auto" for numba if it is installed
+        """
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown kernel backend: {name}")
+        if name == "auto":
+            name = "numpy" if numba is None else "numba"
+        if name == "numba" and numba is None:
+            raise ImportError("The numba kernel backend requires numba")
+        self.name = name
+
+        if name == "numba":
+            jit = numba.njit(cache=True)
+            self._stamp_disk_loop = jit(_stamp_disk_loop)
+            self._catch_outcomes = jit(catch_outcomes)
+            self._step_towards = jit(_step_towards)
+            self._catch_trial = jit(_catch_trial)
+        else:
+            self._stamp_disk_loop = None
+            self._catch_outcomes = None
+            self._step_towards = _step_towards
+            self._catch_trial = _catch_trial
+
+    def __repr__(self) -> str:
+        return f"KernelBackend({self.name!r})"
+
+    def __reduce__(self):
+        # the shared instance of the process, e.g. in a restored snapshot
+        return get_backend, (self.name,)
+
+    def stamp_disk(self, array: np.ndarray, x: int, y: int, radius: int = 3, weight: float = 1.0) -> np.ndarray:
+        """
+        Add the weighted disk around (x, y) to the array in place, clipped at the array edges, see utils.stamp_disk
+        """
+        if self._stamp_disk_loop is None:
+            return stamp_disk(array, x, y, radius, weight)
+        # the weight in the precision of the array, as the numpy kernel adds it
+        self._stamp_disk_loop(array, int(x), int(y), disk_stencil(radius), array.dtype.type(weight))
+        return array
+
+    def step_towards(self, pos: tuple[int, int], destination: tuple[int, int]) -> tuple[int, int]:
+        """
+        Cell one step closer to the destination along each axis
+        """
+        x, y = self._step_towards(pos[0], pos[1], destination[0], destination[1])
+        return int(x), int(y)
+
+    def catch_trial(self, n_fish: float, u: float, catch_threshold: float, max_p_catch: float = 0.8) -> bool:
+        """
+        Outcome of a single fishing trial in a cell with n_fish fish, for the uniform random number u
+        """
+        return bool(self._catch_trial(float(n_fish), float(u), float(catch_threshold), float(max_p_catch)))
+
+    def draw_catches(self, n_fish: int, n_trials: int, catch_threshold: float, rng: np.random.Generator,
+                     max_p_catch: float = 0.8) -> np.ndarray:
+        """
+        Outcomes of consecutive fishing trials in a cell, every catch depletes the cell, see utils.draw_catches
+        """
+        if self._catch_outcomes is None:
+            return draw_catches(n_fish, n_trials, catch_threshold, rng, max_p_catch)
+        return self._catch_outcomes(float(n_fish), rng.random(n_trials), float(catch_threshold), float(max_p_catch))
+
+
+# shared instances, the numba kernels are compiled once per process
+_backends = {}
+
+
+def get_backend(name: str = "numpy") -> KernelBackend:
+    if name == "auto":
+        name = "numpy" if numba is None else "numba"
+    if name not in _backends:
+        _backends[name] = KernelBackend(name)
+    return _backends[name]
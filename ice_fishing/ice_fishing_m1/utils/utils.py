@@ -1,16 +1,104 @@
-from scipy.stats import multivariate_normal
+from functools import lru_cache
+
+from scipy.stats import multivariate_normal, norm
 
 import numpy as np
 from sklearn.datasets import make_blobs
 
 
-def catch_rate(last_catches: list, window_size: int = 50) -> float:
+class CatchHistory:
+    def __init__(self, window_size: int = 50) -> None:
+        """
+        Outcomes of the fishing trials in a bout, 1 for a catch and 0 otherwise.
+
+        Only the last window_size outcomes are kept in a ring buffer, together with running counts, so the memory
+        does not grow with the length of the bout and the rate and the total are available in O(1).
+
+        :param window_size: number of the most recent trials used for the catch rate
+        """
+        self.window_size = window_size
+        self._outcomes = np.zeros(window_size, dtype=np.int8)
+        self._next = 0  # position of the next outcome in the ring buffer
+        self.n_trials = 0  # all trials of the bout
+        self.total = 0  # all catches of the bout
+        self.window_total = 0  # catches among the last window_size trials
+
+    def append(self, caught: int) -> None:
+        if self.n_trials >= self.window_size:
+            # the oldest outcome drops out of the window
+            self.window_total -= int(self._outcomes[self._next])
+        self._outcomes[self._next] = caught
+        self.window_total += caught
+        self.total += caught
+        self.n_trials += 1
+        self._next = (self._next + 1) % self.window_size
+
+    def extend(self, outcomes) -> None:
+        for caught in outcomes:
+            self.append(int(caught))
+
+    def clear(self) -> None:
+        self._next = 0
+        self.n_trials = 0
+        self.total = 0
+        self.window_total = 0
+
+    def __len__(self) -> int:
+        return self.n_trials
+
+    def __iter__(self):
+        # outcomes in the window, from the oldest to the most recent
+        if self.n_trials < self.window_size:
+            return iter(self._outcomes[:self.n_trials].tolist())
+        return iter(np.roll(self._outcomes, -self._next).tolist())
+
+    @property
+    def rate(self) -> float:
+        """
+        Catch rate over the last window_size trials
+        """
+        time_window = min(self.n_trials, self.window_size)
+        return self.window_total / time_window if time_window > 0 else 0.0
+
+
+def catch_rate(last_catches, window_size: int = 50) -> float:
     """
-    Estimate the catch rate based on the last catches
+    Estimate the catch rate based on the last window_size catches
+
+    :param last_catches: CatchHistory or a list of outcomes from the oldest to the most recent
     """
-    n_catches = sum(last_catches[:window_size])
-    time_window = min(len(last_catches), window_size)
-    return n_catches / time_window if time_window > 0 else 0.0
+    if isinstance(last_catches, CatchHistory) and window_size == last_catches.window_size:
+        return last_catches.rate
+    last_catches = list(last_catches)[-window_size:]
+    time_window = len(last_catches)
+    return sum(last_catches) / time_window if time_window > 0 else 0.0
+
+
+def draw_catches(n_fish: int, n_trials: int, catch_threshold: float, rng: np.random.Generator,
+                 max_p_catch: float = 0.8) -> np.ndarray:
+    """
+    Outcomes of consecutive fishing trials in a cell, every catch depletes the cell
+
+    :param n_fish: number of fish in the cell before the first trial
+    :param catch_threshold: number of fish for which the catch probability is 1
+    :return: int8 array, 1 for a catch
+    """
+    return catch_outcomes(float(n_fish), rng.random(n_trials), float(catch_threshold), float(max_p_catch))
+
+
+def catch_outcomes(n_fish: float, u: np.ndarray, catch_threshold: float, max_p_catch: float) -> np.ndarray:
+    """
+    Outcomes of draw_catches for the uniform random numbers u of the trials, the source of the numba kernel
+    """
+    if n_fish - len(u) >= max_p_catch * catch_threshold:
+        # the catch probability stays at its maximum
+        return (u < max_p_catch).astype(np.int8)
+    outcomes = np.zeros(len(u), dtype=np.int8)
+    for i in range(len(u)):
+        if u[i] < min(n_fish / catch_threshold, max_p_catch):
+            outcomes[i] = 1
+            n_fish -= 1
+    return outcomes
 
 
 def gaussian_resource_map(width: int, height: int, mean: tuple[float, float], cov_val: tuple[float, float],
@@ -35,11 +123,8 @@ def gaussian_resource_map(width: int, height: int, mean: tuple[float, float], co
     X, Y = np.meshgrid(x, y)
 
     # Generating the density function
-    # for each point in the meshgrid
-    pdf = np.zeros(X.shape)
-    for i in range(X.shape[0]):
-        for j in range(X.shape[1]):
-            pdf[i, j] = distr.pdf([X[i, j], Y[i, j]])
+    # for all points of the meshgrid at once
+    pdf = distr.pdf(np.dstack((X, Y))).reshape(X.shape)
 
     normalized_pdf = (pdf / np.max(pdf)) * max_value
     return normalized_pdf
@@ -57,11 +142,9 @@ def generate_resource_map(width: int, height: int,
     fish_count, _, _ = np.histogram2d(X[:, 0], X[:, 1], bins=(x_edges, y_edges), density=False)
 
     # add missing samples to the random places
-    n_missing_samples = n_samples - np.sum(fish_count)
-    for _ in range(n_missing_samples.astype(int)):
-        x = np.random.randint(0, width)
-        y = np.random.randint(0, height)
-        fish_count[x, y] += 1
+    rng = np.random.default_rng(random_seed)
+    n_missing_samples = int(n_samples - np.sum(fish_count))
+    np.add.at(fish_count, (rng.integers(0, width, n_missing_samples), rng.integers(0, height, n_missing_samples)), 1)
 
     # rescale to [0, max_value]
     # fish_map = (fish_count / np.max(fish_count)) * max_value
@@ -73,6 +156,53 @@ def generate_resource_map(width: int, height: int,
     return fish_map
 
 
+def sample_resource_map(width: int, height: int,
+                        max_value: float = 0.8,
+                        cluster_std: float = 0.4,
+                        n_samples: int = 100_000,
+                        centers: list[list[float]] = ((1, 1), (-1, 1), (1, -1), (-1, -1)),
+                        random_seed: int = 42) -> np.ndarray:
+    """
+    Same distribution of fish as generate_resource_map, but the cell counts are drawn directly from the
+    discretised gaussian mixture instead of binning individual samples
+    """
+    rng = np.random.default_rng(random_seed)
+    x_edges = np.linspace(-2, 2, width + 1)
+    y_edges = np.linspace(-2, 2, height + 1)
+
+    # make_blobs splits the samples evenly between the centers
+    centers = np.asarray(centers, dtype=float)
+    n_per_center = np.full(len(centers), n_samples // len(centers))
+    n_per_center[:n_samples % len(centers)] += 1
+
+    fish_count = np.zeros((width, height))
+    for (cx, cy), n in zip(centers, n_per_center):
+        p_x = np.diff(norm.cdf(x_edges, loc=cx, scale=cluster_std))
+        p_y = np.diff(norm.cdf(y_edges, loc=cy, scale=cluster_std))
+        p_cells = np.outer(p_x, p_y).ravel()
+        # the last category collects the samples outside of the lake
+        p_outside = max(0.0, 1.0 - p_cells.sum())
+        counts = rng.multinomial(n, np.append(p_cells, p_outside) / (p_cells.sum() + p_outside))
+        fish_count += counts[:-1].reshape(width, height)
+
+    # add missing samples to the random places
+    n_missing_samples = int(n_samples - fish_count.sum())
+    fish_count += rng.multinomial(n_missing_samples, np.full(width * height, 1 / (width * height))).reshape(
+        width, height)
+    return fish_count
+
+
+def sample_gaussian_resource_map(width: int, height: int,
+                                 n_samples: int = 100_000,
+                                 random_seed: int = 42) -> np.ndarray:
+    """
+    Distribute the fish over a single gaussian patch in the middle of the lake
+    """
+    pdf = gaussian_resource_map(width, height, mean=(0, 0), cov_val=(0, 0), random_seed=random_seed).T
+    rng = np.random.default_rng(random_seed)
+    return rng.multinomial(n_samples, (pdf / pdf.sum()).ravel()).reshape(width, height).astype(float)
+
+
 def mean_catch_ratio(agents_total_catch: list[int], total_number_of_fish: int) -> float:
     """
     Calculate the total catch ratio to evaluate the model for the given abundance of fish
@@ -80,13 +210,72 @@ def mean_catch_ratio(agents_total_catch: list[int], total_number_of_fish: int) -
     return np.mean(agents_total_catch) / total_number_of_fish
 
 
+@lru_cache(maxsize=None)
+def disk_stencil(radius: int) -> np.ndarray:
+    """
+    Precomputed (2 * radius + 1, 2 * radius + 1) mask of the cells within the radius around the window center.
+    The mask is cached per radius and read-only.
+    """
+    assert radius > 0, "Radius should be larger than 0"
+    offsets = np.arange(-radius, radius + 1)
+    stencil = (offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius ** 2).astype(float)
+    stencil.setflags(write=False)
+    return stencil
+
+
+def stamp_disk(array: np.ndarray, x: int, y: int, radius: int = 3, weight: float = 1.0) -> np.ndarray:
+    """
+    Add the weighted disk stencil around (x, y) to the array in place, clipped at the array edges
+    """
+    stencil = disk_stencil(radius)
+    x_min, x_max = max(0, x - radius), min(array.shape[0], x + radius + 1)
+    y_min, y_max = max(0, y - radius), min(array.shape[1], y + radius + 1)
+    if x_min >= x_max or y_min >= y_max:
+        return array
+
+    stencil = stencil[x_min - x + radius:x_max - x + radius, y_min - y + radius:y_max - y + radius]
+    if weight != 1:
+        stencil = stencil * weight
+    array[x_min:x_max, y_min:y_max] += stencil.astype(array.dtype, copy=False)
+    return array
+
+
+def disk_likelihood(locs: tuple[tuple[int, int], ...],
+                    weights: tuple[float, ...],
+                    radius: int,
+                    out: np.ndarray) -> np.ndarray:
+    """
+    Likelihood of the weighted disks around the locations, written to out
+    """
+    out.fill(1e-5)  # add a small number to avoid 0 probability
+    for (x, y), weight in zip(locs, weights):
+        stamp_disk(out, x, y, radius, weight)
+    return out
+
+
 def draw_circe_around_point(array: np.ndarray, x: int, y: int, radius: int = 3) -> np.ndarray:
     assert radius > 0, "Radius should be larger than 0"
     assert x < array.shape[0], "x should be smaller than the array width"
     assert y < array.shape[1], "y should be smaller than the array height"
 
-    for xi in range(max(0, x - radius), min(array.shape[0], x + radius + 1)):
-        for yi in range(max(0, y - radius), min(array.shape[1], y + radius + 1)):
-            if (xi - x) ** 2 + (yi - y) ** 2 <= radius ** 2:
-                array[xi, yi] += 1
-    return array
+    return stamp_disk(array, x, y, radius)
+
+
+def greedy_argmax(values: np.ndarray, rng=np.random) -> np.ndarray:
+    """
+    Batched argmax over the last two axes with random tie-breaking
+
+    :param values: array of shape (n, width, height)
+    :param rng: random number generator, np.random or np.random.Generator
+    :return: array of shape (n, 2) with the selected cells
+    """
+    n, width, height = values.shape
+    flat = values.reshape(n, width * height)
+    selected = flat.argmax(axis=1)
+    is_max = flat == flat[np.arange(n), selected][:, None]
+    n_max = np.count_nonzero(is_max, axis=1)
+
+    # select one of the maxima uniformly at random in the rows with ties
+    for row in np.flatnonzero(n_max > 1):
+        selected[row] = np.flatnonzero(is_max[row])[int(rng.random() * n_max[row])]
+    return np.stack(np.unravel_index(selected, (width, height)), axis=1)
@@ -1,3 +1,8 @@
-from ice_fishing_m1.server import server
+import sys
 
-server.launch(open_browser=False, port=8522)
\ No newline at end of file
+from ice_fishing_m1.server import make_server, server
+
+# python run.py --decoupled runs the model in the background and pushes frames at a capped rate
+if "--decoupled" in sys.argv:
+    server = make_server(decoupled=True)
+server.launch(open_browser=False, port=8522)